@@ -1,25 +1,58 @@
 import os
+import json
+import queue
 import datetime
 from functools import wraps
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_bcrypt import Bcrypt
 import jwt # PyJWT
+from sqlalchemy import or_, and_
 
 from config import Config
-from database import db
-from models import User, UserRole # Import necessary models
-from sandbox_executor import execute_code_securely # Import the placeholder
+from database import db, init_database, replica_reads
+from models import User, UserRole, Course, Enrollment, Contest, Assignment, Submission # Import necessary models
+from sandbox_executor import (
+    execute_code_securely, execute_batch, cache_stats, artifact_stats, warm_stats,
+    open_execution_stream, stream_code_execution,
+)
+from identity_cache import init_identity_cache
+from dashboards import build_student_dashboard
+from summaries import rebuild_summaries, check_summaries # Importing also registers the summary listeners
+from attendance import mark_attendance
+from exports import export_rows, stream_csv, stream_ndjson
+from user_import import import_users_csv, ImportFormatError
+from user_listing import list_users, ListingError
+from leaderboard import init_leaderboards, board_page, rebuild_leaderboards, GLOBAL_BOARD
+from similarity import init_similarity, flagged_clusters, similar_submissions, rebuild_signatures
+from response_cache import init_dashboard_cache, invalidate_users, invalidate_all
+from metrics import init_metrics, render_metrics
+from job_queue import ExecutionJobQueue, QueueFullError, RateLimitedError, PRIORITY_CLASSES
 
 # --- App Initialization --- #
 app = Flask(__name__)
 app.config.from_object(Config)
 
 # Initialize extensions
-db.init_app(app)
+init_database(app) # Pool settings and the optional read replica bind
+init_metrics(app, db) # Request latency/SQL accounting for /metrics
 bcrypt = Bcrypt(app)
 CORS(app) # Enable CORS for all routes by default
+identity_cache = init_identity_cache(app) # Per-process user snapshots for token_required
+leaderboards = init_leaderboards(app) # Sync interval for the in-memory boards
+similarity_indexes = init_similarity(app) # Per-assignment MinHash/LSH indexes of submitted code
+dashboard_cache = init_dashboard_cache(app) # Serialized dashboard_data responses with ETags
+
+# Code execution jobs: every /api/execute* run goes through this fair-share scheduler
+execution_jobs = ExecutionJobQueue(
+    workers=app.config['SANDBOX_POOL_SIZE'],
+    max_pending=app.config['EXECUTION_QUEUE_SIZE'],
+    max_running_per_user=app.config['EXECUTION_USER_MAX_RUNNING'],
+    max_pending_per_user=app.config['EXECUTION_USER_MAX_PENDING'],
+    rate_per_minute=app.config['EXECUTION_USER_RATE_PER_MINUTE'],
+    result_ttl=app.config['EXECUTION_RESULT_TTL'],
+)
 
 # --- Database Initialization Command --- #
 # (Run `flask db-init` in the terminal in the backend folder after creating models)
@@ -55,11 +88,48 @@ def init_db():
             print(f"Error creating database tables or admin user: {e}")
             db.session.rollback() # Rollback in case of error
 
+# --- Student Summary Commands --- #
+# Summaries are maintained incrementally; rebuild after bulk imports, deletes of
+# assignments/enrollments or raw SQL fixes, and check to detect drift.
+@app.cli.command('rebuild-summaries')
+def rebuild_summaries_command():
+    """Recompute every student summary from attendance/submission history."""
+    with app.app_context():
+        count = rebuild_summaries()
+        invalidate_all()
+        print(f"Rebuilt {count} student summaries.")
+
+@app.cli.command('check-summaries')
+def check_summaries_command():
+    """Report students whose stored summary differs from their history."""
+    with app.app_context():
+        mismatches = check_summaries()
+        for mismatch in mismatches:
+            print(f"Student {mismatch['student_id']}: {mismatch['fields']}")
+        print(f"{len(mismatches)} inconsistent student summaries.")
+        if mismatches:
+            raise SystemExit(1)
+
+@app.cli.command('rebuild-leaderboards')
+def rebuild_leaderboards_command():
+    """Recompute all leaderboard scores from graded submissions."""
+    with app.app_context():
+        count = rebuild_leaderboards()
+        invalidate_all()
+        print(f"Rebuilt {count} leaderboards.")
+
+@app.cli.command('rebuild-similarity')
+def rebuild_similarity_command():
+    """Recompute the near-duplicate signatures of every submission."""
+    with app.app_context():
+        count = rebuild_signatures()
+        print(f"Signed {count} submissions.")
+
 # --- Authentication Utilities (JWT) --- #
 
 def create_access_token(user):
     payload = {
-        'sub': user.id, # Subject (user id)
+        'sub': str(user.id), # Subject (user id); PyJWT requires a string
         'role': user.role.value,
         'name': user.full_name,
         'iat': datetime.datetime.utcnow(), # Issued at time
@@ -82,9 +152,11 @@ def token_required(f):
 
         try:
             payload = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
-            current_user = User.query.get(payload['sub'])
+            current_user = identity_cache.get(int(payload['sub'])) # UserSnapshot, cached; no DB hit on repeat requests
             if not current_user or not current_user.is_active:
                  return jsonify({'message': 'Invalid or inactive user.'}), 401
+            g.current_user_role = current_user.role.value # Latency metrics are labelled by role
+            g.current_user_id = current_user.id # Read-your-writes routing pins this user after a write
             # Pass user object or relevant info if needed
             # kwargs['current_user'] = current_user
         except jwt.ExpiredSignatureError:
@@ -129,6 +201,14 @@ def role_required(required_role):
 def home():
     return jsonify({"message": "Welcome to Campus Bridge Backend API"})
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of this process's metrics."""
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'message': 'Unauthorized'}), 401
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 # === Authentication Routes ===
 
 @app.route('/api/signup', methods=['POST'])
@@ -180,10 +260,11 @@ def login():
     if not identifier or not password or not role_str:
         return jsonify({'message': 'Identifier, password, and role are required'}), 400
 
-    # Try finding user by email first, then by unique_id
-    user = User.query.filter_by(email=identifier.lower()).first()
-    if not user:
-        user = User.query.filter_by(unique_id=identifier).first()
+    # One indexed lookup on either identifier; an email match wins over a unique_id match
+    candidates = User.query.filter(
+        or_(User.email == identifier.lower(), User.unique_id == identifier)
+    ).limit(2).all()
+    user = next((u for u in candidates if u.email == identifier.lower()), candidates[0] if candidates else None)
 
     # Validate user exists, password matches, role matches, and user is active
     if not user or not user.check_password(password):
@@ -195,6 +276,15 @@ def login():
     if not user.is_active:
         return jsonify({'message': 'Account is inactive. Please contact administrator.'}), 403
 
+    # Transparently upgrade hashes made with a different bcrypt cost (only for logins that succeed)
+    if user.password_needs_rehash():
+        try:
+            user.set_password(password)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Password rehash failed for user {user.id}: {e}")
+
     # Generate JWT token
     token = create_access_token(user)
 
@@ -226,6 +316,7 @@ def forgot_password():
 
 @app.route('/api/profile', methods=['GET'])
 @token_required
+@replica_reads
 def get_profile(current_user):
     # The current_user object is passed by the token_required decorator
     return jsonify({
@@ -235,133 +326,436 @@ def get_profile(current_user):
 
 # === Compiler Route ===
 
+def resolve_execution_priority(current_user, assignment_id, requested=None, default='practice'):
+    """Priority class for a run, decided by the server from what the run is for.
+
+    A student's run for an assignment of a course they are enrolled in is 'graded',
+    or 'contest' while the assignment's contest is open; anything else is 'practice'.
+    Faculty and admins may pick any class (requested), falling back to default.
+    """
+    if current_user.role != UserRole.STUDENT:
+        return requested if requested in PRIORITY_CLASSES else default
+    try:
+        assignment_id = int(assignment_id)
+    except (TypeError, ValueError):
+        return 'practice'
+    row = (
+        db.session.query(Assignment.contest_id, Contest.starts_at, Contest.ends_at)
+        .join(Enrollment, and_(Enrollment.course_id == Assignment.course_id, Enrollment.student_id == current_user.id))
+        .outerjoin(Contest, Contest.id == Assignment.contest_id)
+        .filter(Assignment.id == assignment_id)
+        .first()
+    )
+    if row is None:
+        return 'practice'
+    contest_id, starts_at, ends_at = row
+    now = datetime.datetime.utcnow()
+    if contest_id is not None and (starts_at is None or starts_at <= now) and (ends_at is None or now <= ends_at):
+        return 'contest'
+    return 'graded'
+
+def submit_execution_job(current_user, priority, fn, *args, cost=1):
+    """Queue a sandbox job. Returns (job_id, None) or (None, error response)."""
+    try:
+        return execution_jobs.submit(current_user.id, priority, fn, *args, cost=cost), None
+    except RateLimitedError as e:
+        response = jsonify({'success': False, 'message': str(e)})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return None, (response, 429)
+    except QueueFullError as e:
+        response = jsonify({'success': False, 'message': 'Execution queue is full. Please retry shortly.'})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return None, (response, 503)
+
 @app.route('/api/execute', methods=['POST'])
 @token_required # Secure the endpoint
 def handle_code_execution(current_user):
-    # Add rate limiting or further checks if needed
     data = request.get_json()
     language = data.get('language')
     code = data.get('code')
     input_data = data.get('input', '')
+    priority = resolve_execution_priority(current_user, data.get('assignment_id'), data.get('priority'))
 
     if not language or code is None:
         return jsonify({'success': False, 'stderr': 'Language and code are required.'}), 400
 
-    # --- Call the secure execution function --- #
-    # IMPORTANT: Replace execute_code_securely with your actual sandbox implementation
+    # --- Streaming mode: forward output as Server-Sent Events while the program runs --- #
+    if request.args.get('stream') in ('1', 'true', 'sse'):
+        events, cancel = open_execution_stream()
+        job_id, error = submit_execution_job(current_user, priority, stream_code_execution,
+                                             language, code, input_data, events, cancel)
+        if error:
+            return error
+
+        def generate():
+            try:
+                yield f"event: job\ndata: {json.dumps({'job_id': job_id, 'priority': priority})}\n\n"
+                while True:
+                    try:
+                        kind, payload = events.get(timeout=15)
+                    except queue.Empty:
+                        yield ': keep-alive\n\n' # Also how a dropped client is noticed
+                        continue
+                    yield f'event: {kind}\ndata: {json.dumps(payload)}\n\n'
+                    if kind == 'result':
+                        return
+            finally:
+                cancel.set() # Client disconnected (or run finished): stop the sandbox process
+
+        return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    job_id, error = submit_execution_job(current_user, priority, execute_code_securely, language, code, input_data)
+    if error:
+        return error
+
+    # --- Async mode: return the job id right away --- #
+    if request.args.get('async') in ('1', 'true'):
+        return jsonify({'job_id': job_id, 'status': 'queued', 'priority': priority}), 202
+
+    # --- Sync mode: wait for the scheduled run; a run still queued after the wait is withdrawn --- #
+    result = execution_jobs.wait(job_id, timeout=app.config['EXECUTION_SYNC_WAIT_TIMEOUT'])
+    if result is None and execution_jobs.cancel(job_id):
+        response = jsonify({'success': False, 'message': 'The execution server is busy. Please retry shortly.'})
+        response.headers['Retry-After'] = str(execution_jobs.retry_after())
+        return response, 503
+    if result is None:
+        result = execution_jobs.wait(job_id) # Already running: bounded by the sandbox wall clock
+    return jsonify(result), 200
+
+def run_batch_into(out, language, code, cases, stop_on_failure):
+    """Scheduler job body for batch runs: forwards each verdict to the streaming response."""
     try:
-        result = execute_code_securely(language, code, input_data)
-        return jsonify(result), 200
+        for verdict in execute_batch(language, code, cases, stop_on_failure=stop_on_failure):
+            out.put(verdict)
     except Exception as e:
-        print(f"Code execution sandbox call failed: {e}")
-        return jsonify({'success': False, 'stderr': f'Code execution failed on server: {e}'}), 500
+        print(f"Batch execution failed: {e}")
+        out.put({'case': None, 'verdict': 'SE', 'stderr': f'Code execution failed on server: {e}'})
+        out.put({'summary': {'total': len(cases), 'run': 0, 'passed': 0, 'verdicts': {'SE': 1}}})
+    return {'success': True}
+
+@app.route('/api/execute/batch', methods=['POST'])
+@token_required
+def handle_batch_execution(current_user):
+    """Run one submission against many test cases, streaming one NDJSON line per case."""
+    data = request.get_json()
+    language = data.get('language')
+    code = data.get('code')
+    cases = data.get('cases')
+    stop_on_failure = bool(data.get('stop_on_failure', False))
+    priority = resolve_execution_priority(current_user, data.get('assignment_id'), data.get('priority'), default='graded')
+
+    if not language or code is None or not isinstance(cases, list) or not cases:
+        return jsonify({'success': False, 'message': 'Language, code and a non-empty list of cases are required.'}), 400
+    if len(cases) > app.config['EXECUTION_BATCH_MAX_CASES']:
+        return jsonify({'success': False, 'message': f"At most {app.config['EXECUTION_BATCH_MAX_CASES']} cases per batch."}), 400
+    if not all(isinstance(case, dict) for case in cases):
+        return jsonify({'success': False, 'message': 'Each case must be an object with an input field.'}), 400
+
+    out = queue.Queue()
+    _, error = submit_execution_job(current_user, priority, run_batch_into, out, language, code, cases, stop_on_failure,
+                                    cost=len(cases))
+    if error:
+        return error
+
+    def verdicts():
+        while True:
+            verdict = out.get()
+            yield verdict
+            if 'summary' in verdict:
+                return
+
+    if request.args.get('stream') in ('0', 'false'):
+        results = list(verdicts())
+        return jsonify({'cases': results[:-1], 'summary': results[-1]['summary']}), 200
+
+    def generate():
+        for verdict in verdicts():
+            yield json.dumps(verdict) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/execute/<job_id>', methods=['GET'])
+@token_required
+def get_execution_job(current_user, job_id):
+    job = execution_jobs.get(job_id, current_user.id)
+    if job is None:
+        return jsonify({'message': 'Job not found or expired.'}), 404
+    return jsonify(job), 200 if job['status'] == 'done' else 202
+
+@app.route('/api/admin/execution/stats', methods=['GET'])
+@role_required(UserRole.ADMIN)
+def get_execution_stats(current_user):
+    return jsonify({
+        'cache': cache_stats(),
+        'artifacts': artifact_stats(),
+        'runs': warm_stats(),
+        'queue': execution_jobs.stats(),
+    }), 200
 
 # === Placeholder Routes for Dashboard Data ===
 # (These need implementation: fetching from DB, role checks)
 
+# --- Leaderboards --- #
+@app.route('/api/leaderboard', methods=['GET'])
+@token_required
+@replica_reads
+def get_leaderboard(current_user):
+    """Top of a board (?board=global or contest:<id>, ?limit, ?offset) plus the caller's own rank."""
+    name = request.args.get('board') or GLOBAL_BOARD
+    if name != GLOBAL_BOARD and not (name.startswith('contest:') and name[len('contest:'):].isdigit()):
+        return jsonify({'message': "board must be 'global' or 'contest:<id>'"}), 400
+    try:
+        limit = min(max(int(request.args.get('limit') or 10), 1), 100)
+        offset = max(int(request.args.get('offset') or 0), 0)
+    except ValueError:
+        return jsonify({'message': 'limit and offset must be integers'}), 400
+    student_id = current_user.id if current_user.role == UserRole.STUDENT else None
+    return jsonify(board_page(name, limit, offset, student_id)), 200
+
 # --- Student Data --- #
 @app.route('/api/student/dashboard_data', methods=['GET'])
 @role_required(UserRole.STUDENT)
+@replica_reads
 def get_student_dashboard(current_user):
-    # TODO: Fetch stats, attendance, courses, assignments for the current_user (student)
-    print(f"Fetching dashboard data for student: {current_user.id}")
-    # Simulate data based on frontend
-    sample_data = {
-        'stats': { 'attendance': 92, 'pending': 3, 'streak': 15, 'badges': 5 },
-        'attendance': [
-            { 'course': "CS101", 'rate': "95%" },
-            { 'course': "MA101", 'rate': "88%" },
-            { 'course': "PH101", 'rate': "90%" },
-        ],
-        'detailedAttendance': [
-            { 'course': 'CS101 - Intro to Programming', 'percentage': 95, 'present': 19, 'total': 20 },
-            { 'course': 'MA101 - Calculus I', 'percentage': 88, 'present': 15, 'total': 17 },
-            { 'course': 'PH101 - Physics', 'percentage': 90, 'present': 18, 'total': 20 },
-            { 'course': 'CH101 - Chemistry', 'percentage': 74, 'present': 14, 'total': 19 },
-            { 'course': 'HS101 - History', 'percentage': 60, 'present': 12, 'total': 20 },
-        ],
-         'courses': [
-            { 'id': 'cs101', 'name': "CS101 - Intro to Programming", 'links': [{ 'name': 'Notes', 'url': '#' }, { 'name': 'Videos', 'url': '#' }, { 'name': 'Syllabus', 'url': '#' }] },
-            { 'id': 'ma101', 'name': "MA101 - Calculus I", 'links': [{ 'name': 'Problems', 'url': '#' }, { 'name': 'Recordings', 'url': '#' }] },
-            { 'id': 'ph101', 'name': "PH101 - Physics", 'links': [{ 'name': 'Manuals', 'url': '#' }, { 'name': 'Slides', 'url': '#' }] },
-        ],
-        'assignments': [
-            { 'id': 'a1', 'course': 'CS101', 'title': 'Lab 1: Variables', 'due': '2024-06-10', 'status': 'Submitted', 'grade': 'A', 'review': 'Good work!' },
-            { 'id': 'a2', 'course': 'MA101', 'title': 'Problem Set 2', 'due': '2024-06-15', 'status': 'Pending', 'grade': '-', 'review': None },
-            { 'id': 'a3', 'course': 'CS101', 'title': 'Quiz 1: Basics', 'due': '2024-06-05', 'status': 'Graded', 'grade': '85/100', 'review': 'Solid understanding.' },
-            { 'id': 'a4', 'course': 'CS101', 'title': 'Lab 2: Conditionals', 'due': '2024-06-20', 'status': 'Pending', 'grade': '-', 'review': None },
-        ],
-        'profile': {
-            'name': current_user.full_name,
-            'id': current_user.unique_id,
-            'email': current_user.email,
-            'badges': ['Pythonista', 'DSA Novice', 'Web Crawler', '10-Day Streak', 'Problem Solver'],
-            'currentStreak': 15,
-            'longestStreak': 21
-        },
-        'codingTracks': [
-            { 'id': 'track1', 'name': 'DSA Essentials' },
-            { 'id': 'track2', 'name': 'Web Development (MERN)' },
-            { 'id': 'track3', 'name': 'Python for Data Science' },
-        ],
-        'jobMatches': [
-            { 'title': 'Junior Web Developer', 'skills': 'HTML, CSS, JS, React', 'match': '75%', 'detail': 'Strong in JS, Learning React' },
-            { 'title': 'Python Dev Intern', 'skills': 'Python, Algo, Git', 'match': '90%', 'detail': 'Excellent Python skills' },
-        ]
-    }
-    return jsonify(sample_data), 200
+    # Courses, attendance and assignments come from a fixed number of aggregate queries,
+    # and only when the cached response is stale (see response_cache.py)
+    return dashboard_cache.serve('student', current_user.id, lambda: build_student_dashboard(current_user))
 
 # --- Faculty Data --- #
 @app.route('/api/faculty/dashboard_data', methods=['GET'])
 @role_required(UserRole.FACULTY)
+@replica_reads
 def get_faculty_dashboard(current_user):
-    # TODO: Fetch courses taught by faculty, submissions for those courses, etc.
-    print(f"Fetching dashboard data for faculty: {current_user.id}")
-    # Simulate data based on frontend
-    sample_data = {
-        'courses': [{ 'id': 'cs101', 'name': 'CS101 - Intro to Programming' }, { 'id': 'cs201', 'name': 'CS201 - Data Structures' }],
-        'submissions': [
-            { 'studentId': '101', 'studentName': 'Alice Smith', 'assignmentId': 'a1', 'assignmentName': 'Lab 1: Variables', 'submittedOn': '2024-06-09', 'status': 'Submitted', 'grade': None, 'submissionData': 'print("Hello")', 'review': None },
-            { 'studentId': '103', 'studentName': 'Charlie Brown', 'assignmentId': 'a1', 'assignmentName': 'Lab 1: Variables', 'submittedOn': '2024-06-10', 'status': 'Submitted', 'grade': None, 'submissionData': 'print("World")', 'review': None },
-        ],
-        'students': [
-            { 'id': '101', 'name': 'Alice Smith' }, { 'id': '102', 'name': 'Bob Johnson' },
-            { 'id': '103', 'name': 'Charlie Brown' }, { 'id': '104', 'name': 'Diana Prince' }
-        ]
-    }
-    return jsonify(sample_data), 200
+    def build():
+        # TODO: Fetch courses taught by faculty, submissions for those courses, etc.
+        print(f"Fetching dashboard data for faculty: {current_user.id}")
+        # Simulate data based on frontend
+        sample_data = {
+            'courses': [{ 'id': 'cs101', 'name': 'CS101 - Intro to Programming' }, { 'id': 'cs201', 'name': 'CS201 - Data Structures' }],
+            'submissions': [
+                { 'studentId': '101', 'studentName': 'Alice Smith', 'assignmentId': 'a1', 'assignmentName': 'Lab 1: Variables', 'submittedOn': '2024-06-09', 'status': 'Submitted', 'grade': None, 'submissionData': 'print("Hello")', 'review': None },
+                { 'studentId': '103', 'studentName': 'Charlie Brown', 'assignmentId': 'a1', 'assignmentName': 'Lab 1: Variables', 'submittedOn': '2024-06-10', 'status': 'Submitted', 'grade': None, 'submissionData': 'print("World")', 'review': None },
+            ],
+            'students': [
+                { 'id': '101', 'name': 'Alice Smith' }, { 'id': '102', 'name': 'Bob Johnson' },
+                { 'id': '103', 'name': 'Charlie Brown' }, { 'id': '104', 'name': 'Diana Prince' }
+            ]
+        }
+        return sample_data
+    return dashboard_cache.serve('faculty', current_user.id, build)
+
+@app.route('/api/faculty/attendance', methods=['POST'])
+@role_required([UserRole.FACULTY, UserRole.ADMIN])
+def post_attendance(current_user):
+    """Mark a whole roster for one (course, date): {courseId, date, presentIds, absentIds}."""
+    data = request.get_json() or {}
+    course_ref = str(data.get('courseId') or '') # Course id or course code
+    present_ids = [str(i) for i in data.get('presentIds') or []]
+    absent_ids = [str(i) for i in data.get('absentIds') or []]
+
+    if not course_ref or not data.get('date'):
+        return jsonify({'message': 'courseId and date are required'}), 400
+    try:
+        day = datetime.date.fromisoformat(data['date'])
+    except (TypeError, ValueError):
+        return jsonify({'message': 'date must be YYYY-MM-DD'}), 400
+    if len(present_ids) + len(absent_ids) > app.config['ATTENDANCE_MAX_ROSTER']:
+        return jsonify({'message': f"At most {app.config['ATTENDANCE_MAX_ROSTER']} students per request"}), 413
+
+    # Lock the course row so concurrent submissions of the same sheet serialize
+    match = Course.course_code == course_ref
+    if course_ref.isdigit():
+        match = or_(match, Course.id == int(course_ref))
+    course = Course.query.filter(match).with_for_update().first()
+    if not course:
+        return jsonify({'message': 'Course not found'}), 404
+    if current_user.role == UserRole.FACULTY and course.faculty_id != current_user.id:
+        db.session.rollback()
+        return jsonify({'message': 'You do not teach this course'}), 403
+
+    try:
+        counts, changed_ids = mark_attendance(course.id, day, present_ids, absent_ids)
+        db.session.commit()
+        invalidate_users(changed_ids) # The upsert bypasses the ORM events that normally do this
+    except Exception as e:
+        db.session.rollback()
+        print(f"Attendance Error: {e}")
+        return jsonify({'message': 'Error saving attendance'}), 500
+    return jsonify(dict(counts, message='Attendance saved', course=course.course_code, date=day.isoformat())), 200
+
+@app.route('/api/faculty/courses/<int:course_id>/export', methods=['GET'])
+@role_required([UserRole.FACULTY, UserRole.ADMIN])
+@replica_reads
+def export_course(current_user, course_id):
+    """Stream every (student, assignment) row of a course: ?format=csv|ndjson, ?source=1 adds code."""
+    export_format = (request.args.get('format') or 'csv').lower()
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'message': 'format must be csv or ndjson'}), 400
+    include_source = request.args.get('source', '').lower() in ('1', 'true', 'yes')
+
+    course = db.session.get(Course, course_id)
+    if not course:
+        return jsonify({'message': 'Course not found'}), 404
+    if current_user.role == UserRole.FACULTY and course.faculty_id != current_user.id:
+        return jsonify({'message': 'You do not teach this course'}), 403
+
+    batch_size = app.config['EXPORT_BATCH_SIZE']
+    rows = export_rows(course.id, include_source, batch_size)
+    if export_format == 'csv':
+        body, mimetype = stream_csv(rows, include_source, batch_size), 'text/csv'
+    else:
+        body, mimetype = stream_ndjson(rows, batch_size), 'application/x-ndjson'
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{course.course_code}-submissions.{export_format}"'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def parse_similarity_threshold():
+    """?threshold= as a float in (0, 1], defaulting to SIMILARITY_THRESHOLD. Returns (value, error response)."""
+    try:
+        threshold = float(request.args.get('threshold') or app.config['SIMILARITY_THRESHOLD'])
+    except ValueError:
+        threshold = None
+    if threshold is None or not 0 < threshold <= 1:
+        return None, (jsonify({'message': 'threshold must be a number between 0 and 1'}), 400)
+    return threshold, None
+
+@app.route('/api/faculty/courses/<int:course_id>/similarity', methods=['GET'])
+@role_required([UserRole.FACULTY, UserRole.ADMIN])
+@replica_reads
+def get_course_similarity(current_user, course_id):
+    """Clusters of near-duplicate submissions for each assignment of a course (?assignment_id= for one)."""
+    threshold, error = parse_similarity_threshold()
+    if error:
+        return error
+
+    course = db.session.get(Course, course_id)
+    if not course:
+        return jsonify({'message': 'Course not found'}), 404
+    if current_user.role == UserRole.FACULTY and course.faculty_id != current_user.id:
+        return jsonify({'message': 'You do not teach this course'}), 403
+
+    query = Assignment.query.filter_by(course_id=course.id)
+    if request.args.get('assignment_id'):
+        try:
+            query = query.filter_by(id=int(request.args['assignment_id']))
+        except ValueError:
+            return jsonify({'message': 'assignment_id must be an integer'}), 400
+    assignments = []
+    for assignment in query.order_by(Assignment.due_date, Assignment.id):
+        assignments.append(dict(flagged_clusters(assignment.id, threshold),
+                                assignmentId=assignment.id, assignmentName=assignment.title))
+    return jsonify({'courseId': course.id, 'threshold': threshold, 'assignments': assignments}), 200
+
+@app.route('/api/faculty/submissions/<int:submission_id>/similar', methods=['GET'])
+@role_required([UserRole.FACULTY, UserRole.ADMIN])
+@replica_reads
+def get_similar_submissions(current_user, submission_id):
+    """Submissions of the same assignment at least ?threshold= similar to this one."""
+    threshold, error = parse_similarity_threshold()
+    if error:
+        return error
+
+    row = db.session.execute(
+        db.select(Submission.assignment_id, Course.faculty_id)
+        .join(Assignment, Assignment.id == Submission.assignment_id)
+        .join(Course, Course.id == Assignment.course_id)
+        .where(Submission.id == submission_id)
+    ).first()
+    if not row:
+        return jsonify({'message': 'Submission not found'}), 404
+    if current_user.role == UserRole.FACULTY and row.faculty_id != current_user.id:
+        return jsonify({'message': 'You do not teach this course'}), 403
+
+    return jsonify({'submissionId': submission_id, 'assignmentId': row.assignment_id, 'threshold': threshold,
+                    'similar': similar_submissions(row.assignment_id, submission_id, threshold)}), 200
 
 # --- Admin Data --- #
 @app.route('/api/admin/dashboard_data', methods=['GET'])
 @role_required(UserRole.ADMIN)
+@replica_reads
 def get_admin_dashboard(current_user):
-    # TODO: Fetch users, courses, metrics, events
-    print(f"Fetching dashboard data for admin: {current_user.id}")
-     # Simulate data based on frontend
-    sample_data = {
-        'users': [
-            { 'id': '101', 'name': 'Alice Smith', 'email': 'alice@example.com', 'role': 'Student', 'status': 'Active' },
-            { 'id': 'F201', 'name': 'Prof. Davis', 'email': 'davis@example.com', 'role': 'Faculty', 'status': 'Active' },
-            { 'id': 'ADM01', 'name': current_user.full_name, 'email': current_user.email, 'role': 'Admin', 'status': 'Active' },
-        ],
-        'courses': [
-            { 'code': 'CS101', 'title': 'Intro to Programming', 'faculty': 'Prof. Davis' },
-            { 'code': 'MA101', 'title': 'Calculus I', 'faculty': 'Prof. Einstein' },
-        ],
-        'leaderboard': [
-            { 'name': 'Alice Smith', 'score': 1500 },
-            { 'name': 'Charlie Brown', 'score': 1300 },
-        ],
-        'metrics': { 'totalUsers': 150, 'activeStudents': 120, 'submissionsToday': 45 },
-        'events': [
-            { 'id': 'e1', 'type': 'Contest', 'title': 'Weekly Challenge #5', 'datetime': '2024-07-01T10:00' },
-            { 'id': 'e2', 'type': 'Test', 'title': 'Mock Placement Test - July', 'datetime': '2024-07-15T14:00' }
-        ]
-    }
-    return jsonify(sample_data), 200
+    def build():
+        # TODO: Fetch users, courses, metrics, events
+        print(f"Fetching dashboard data for admin: {current_user.id}")
+         # Simulate data based on frontend
+        sample_data = {
+            'users': [
+                { 'id': '101', 'name': 'Alice Smith', 'email': 'alice@example.com', 'role': 'Student', 'status': 'Active' },
+                { 'id': 'F201', 'name': 'Prof. Davis', 'email': 'davis@example.com', 'role': 'Faculty', 'status': 'Active' },
+                { 'id': 'ADM01', 'name': current_user.full_name, 'email': current_user.email, 'role': 'Admin', 'status': 'Active' },
+            ],
+            'courses': [
+                { 'code': 'CS101', 'title': 'Intro to Programming', 'faculty': 'Prof. Davis' },
+                { 'code': 'MA101', 'title': 'Calculus I', 'faculty': 'Prof. Einstein' },
+            ],
+            'leaderboard': [{'name': e['name'], 'score': e['score']} for e in board_page(GLOBAL_BOARD, 10)['top']],
+            'metrics': { 'totalUsers': 150, 'activeStudents': 120, 'submissionsToday': 45 },
+            'events': [
+                { 'id': 'e1', 'type': 'Contest', 'title': 'Weekly Challenge #5', 'datetime': '2024-07-01T10:00' },
+                { 'id': 'e2', 'type': 'Test', 'title': 'Mock Placement Test - July', 'datetime': '2024-07-15T14:00' }
+            ]
+        }
+        return sample_data
+    return dashboard_cache.serve('admin', current_user.id, build)
+
+@app.route('/api/admin/users', methods=['GET'])
+@role_required(UserRole.ADMIN)
+@replica_reads
+def get_admin_users(current_user):
+    """One page of users, newest first.
+
+    Query params: limit, cursor (nextCursor of the previous page), role, is_active
+    (true/false), q (prefix of name, email or unique_id), fields (comma separated).
+    """
+    args = request.args
+    try:
+        limit = min(int(args.get('limit') or app.config['ADMIN_USERS_PAGE_SIZE']), app.config['ADMIN_USERS_PAGE_MAX'])
+    except ValueError:
+        return jsonify({'message': 'limit must be an integer'}), 400
+    is_active = args.get('is_active')
+    if is_active is not None:
+        if is_active.lower() not in ('true', 'false', '1', '0'):
+            return jsonify({'message': 'is_active must be true or false'}), 400
+        is_active = is_active.lower() in ('true', '1')
+
+    try:
+        page = list_users(max(limit, 1), cursor=args.get('cursor'), role=args.get('role'), is_active=is_active,
+                          search=(args.get('q') or '').strip() or None, fields=args.get('fields'))
+    except ListingError as e:
+        return jsonify({'message': str(e)}), 400
+    return jsonify(page), 200
+
+@app.route('/api/admin/users/import', methods=['POST'])
+@role_required(UserRole.ADMIN)
+def import_users(current_user):
+    """Bulk-create students/faculty from a CSV (multipart 'file', or a text/csv body).
+
+    Columns: unique_id (or userid), email, full_name (or name), password, optional role.
+    Returns counts and an error entry per rejected row.
+    """
+    if request.mimetype == 'text/csv':
+        stream = request.stream # Read straight off the socket, never buffered whole
+    elif 'file' in request.files:
+        stream = request.files['file'].stream
+    else:
+        return jsonify({'message': "Upload a CSV as multipart field 'file' or with Content-Type: text/csv"}), 400
+
+    try:
+        report = import_users_csv(stream, app.config['USER_IMPORT_CHUNK_SIZE'])
+        if report['created']:
+            invalidate_users([]) # Admin dashboards only: new users have no dashboard yet
+    except ImportFormatError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"User Import Error: {e}")
+        return jsonify({'message': 'Error importing users'}), 500
+    print(f"Admin {current_user.id} imported {report['created']} users ({report['failed']} rows rejected)")
+    return jsonify(dict(report, message=f"Imported {report['created']} users")), 200
 
 # Add more specific API routes for actions (POST/PUT/DELETE) as needed
-# Example: POST /api/faculty/attendance
 # Example: PUT /api/admin/users/{user_id}/status
 # Example: POST /api/admin/courses
 
@@ -0,0 +1,80 @@
+# backend/artifact_cache.py
+
+import os
+import uuid
+import shutil
+import threading
+
+
+class ArtifactCache:
+    """On-disk store of compiled programs, shared by all sandbox worker processes.
+
+    Each entry is a directory named by its key holding the files a compiler
+    produced (e.g. 'main' or '*.class'). Entries are published with an atomic
+    rename, so concurrent workers never see a half-written entry. Reads bump the
+    entry's mtime; when the store grows past max_bytes the least recently used
+    entries are removed.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, key, dest_dir):
+        """Copy the cached artifacts for key into dest_dir. Returns False on a miss."""
+        entry = self._entry(key)
+        try:
+            names = os.listdir(entry)
+            for name in names:
+                shutil.copy2(os.path.join(entry, name), os.path.join(dest_dir, name))
+            os.utime(entry)
+        except FileNotFoundError: # Missing, or evicted by another worker mid-copy
+            return False
+        return bool(names)
+
+    def put(self, key, src_dir, names):
+        """Store the named files from src_dir under key, then enforce the size cap."""
+        if self.max_bytes <= 0 or not names:
+            return
+        staging = os.path.join(self.root, f'.tmp-{uuid.uuid4().hex}')
+        os.makedirs(staging)
+        try:
+            for name in names:
+                shutil.copy2(os.path.join(src_dir, name), os.path.join(staging, name))
+            os.rename(staging, self._entry(key))
+        except OSError: # Another worker published the same key first
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+        self._evict()
+
+    def _scan(self):
+        entries = []
+        with os.scandir(self.root) as it:
+            for d in it:
+                if d.name.startswith('.tmp-') or not d.is_dir():
+                    continue
+                try:
+                    size = sum(f.stat().st_size for f in os.scandir(d.path))
+                    entries.append((d.stat().st_mtime, size, d.path))
+                except FileNotFoundError:
+                    continue
+        return entries
+
+    def _evict(self):
+        with self._lock:
+            entries = self._scan()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+
+    def stats(self):
+        entries = self._scan()
+        return {'entries': len(entries), 'bytes': sum(size for _, size, _ in entries), 'max_bytes': self.max_bytes}
@@ -0,0 +1,64 @@
+# backend/attendance.py
+
+from sqlalchemy import select, and_
+
+from database import db, upsert
+from models import User, Enrollment, Attendance
+from summaries import apply_attendance_changes
+
+# Bulk attendance for one (course, date). The roster is validated and the
+# existing marks read in one query; only rows that are new or changed are
+# written, in one multi-row upsert; student summaries are updated with a fixed
+# number of set-based statements. Re-submitting the same sheet writes nothing.
+
+def _upsert_attendance(connection, rows):
+    """INSERT ... ON DUPLICATE KEY / ON CONFLICT DO UPDATE of is_present (per-row merge on other dialects)."""
+    upsert(connection, Attendance.__table__, rows, ['student_id', 'course_id', 'date'], {'is_present': None})
+
+
+def mark_attendance(course_id, day, present_ids, absent_ids):
+    """Record attendance for course_id on day. IDs are student unique_ids.
+
+    IDs that are unknown, not enrolled, or listed as both present and absent are
+    rejected; the rest are written. Returns (counts dict incl. the rejected IDs,
+    ids of students whose mark changed). The caller commits.
+    """
+    present_ids, absent_ids = set(present_ids), set(absent_ids)
+    conflicting = present_ids & absent_ids
+    wanted = {uid: True for uid in present_ids - conflicting}
+    wanted.update({uid: False for uid in absent_ids - conflicting})
+
+    connection = db.session.connection()
+    roster = connection.execute(
+        select(User.id, User.unique_id, Attendance.is_present)
+        .join(Enrollment, and_(Enrollment.student_id == User.id, Enrollment.course_id == course_id))
+        .outerjoin(Attendance, and_(Attendance.student_id == User.id, Attendance.course_id == course_id, Attendance.date == day))
+        .where(User.unique_id.in_(list(wanted)))
+    ).all() if wanted else []
+
+    changes = []
+    for student_id, unique_id, old in roster:
+        new = wanted[unique_id]
+        if old is None or bool(old) != new:
+            changes.append((student_id, None if old is None else bool(old), new))
+    if changes:
+        _upsert_attendance(connection, [
+            {'student_id': student_id, 'course_id': course_id, 'date': day, 'is_present': new}
+            for student_id, _, new in changes
+        ])
+        apply_attendance_changes(connection, day, changes)
+
+    accepted = {unique_id for _, unique_id, _ in roster}
+    rejected = sorted(conflicting | (set(wanted) - accepted))
+    inserted = sum(1 for _, old, _ in changes if old is None)
+    counts = {
+        'marked': len(roster),
+        'present': sum(1 for _, unique_id, _ in roster if wanted[unique_id]),
+        'absent': sum(1 for _, unique_id, _ in roster if not wanted[unique_id]),
+        'inserted': inserted,
+        'updated': len(changes) - inserted,
+        'unchanged': len(roster) - len(changes),
+        'rejected': len(rejected),
+        'rejectedIds': rejected,
+    }
+    return counts, [student_id for student_id, _, _ in changes]
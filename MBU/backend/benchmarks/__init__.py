@@ -0,0 +1,3 @@
+# backend/benchmarks
+# Run from the backend folder, e.g. `python -m benchmarks.login_bench --help`.
+# `python -m benchmarks.suite` runs the full load suite (login, dashboards, execute, admin listing).
@@ -0,0 +1,101 @@
+# backend/benchmarks/login_bench.py
+"""Microbenchmark for POST /api/login: reports logins/sec and latency percentiles.
+
+Runs the Flask app in-process against a throwaway SQLite database (or --db).
+Usage (from the backend folder):
+    python -m benchmarks.login_bench --users 200 --requests 2000 --concurrency 32
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=None, help='bcrypt cost (default: Config.BCRYPT_LOG_ROUNDS)')
+    parser.add_argument('--db', default=None, help='SQLAlchemy URI (default: temporary SQLite file)')
+    args = parser.parse_args()
+
+    # Point the app at the benchmark database before it is imported.
+    import config
+    db_file = None
+    if args.db:
+        config.Config.SQLALCHEMY_DATABASE_URI = args.db
+    else:
+        db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+        config.Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_file}'
+    if args.rounds:
+        config.Config.BCRYPT_LOG_ROUNDS = args.rounds
+
+    from app import app
+    from database import db
+    from models import User, UserRole
+    from passwords import hash_password
+
+    with app.app_context():
+        db.create_all()
+        password_hash = hash_password('benchpass') # One hash shared by all seeded users
+        db.session.add_all([
+            User(unique_id=f'BENCH{i:05d}', email=f'bench{i}@example.com', full_name=f'Bench User {i}',
+                 role=UserRole.STUDENT, password_hash=password_hash)
+            for i in range(args.users)
+        ])
+        db.session.commit()
+
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(args.requests))
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            identifier = f'bench{i % args.users}@example.com' if i % 2 else f'BENCH{i % args.users:05d}'
+            started = time.perf_counter()
+            response = client.post('/api/login', json={'identifier': identifier, 'password': 'benchpass', 'role': 'student'})
+            elapsed = time.perf_counter() - started
+            assert response.status_code == 200, response.get_json()
+            with lock:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    pct = lambda p: round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2)
+    print(json.dumps({
+        'benchmark': 'login',
+        'requests': len(latencies),
+        'concurrency': args.concurrency,
+        'bcrypt_rounds': config.Config.BCRYPT_LOG_ROUNDS,
+        'bcrypt_workers': config.Config.BCRYPT_WORKERS,
+        'logins_per_sec': round(len(latencies) / wall, 2),
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+    }, indent=2))
+
+    if db_file:
+        os.remove(db_file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+# backend/benchmarks/suite.py
+"""Load benchmark for the backend: seeded data, concurrent scenarios, JSON report.
+
+Runs the Flask app in-process against a throwaway SQLite database, or --db (or
+BENCH_DATABASE_URL) pointing at an empty scratch database (e.g. a local MySQL),
+seeds users, courses, enrollments, assignments, attendance and submissions, then
+drives each scenario from --concurrency threads:
+
+    login       POST /api/login (bcrypt bound)
+    dashboard   GET /api/student/dashboard_data with tokens, revalidating with If-None-Match
+    execute     POST /api/execute through the job scheduler, with a deterministic fake sandbox
+    admin_list  GET /api/admin/users, walking the keyset pages
+
+The report (stdout, and --output) holds throughput and p50/p95/p99 per scenario;
+pass an earlier report as --baseline to add ratios against it.
+Usage (from the backend folder):
+    python -m benchmarks.suite --users 1000 --courses 20 --submissions 5000 --output bench.json
+    python -m benchmarks.suite --scenarios dashboard,admin_list --baseline bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+import datetime
+import tempfile
+import threading
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCENARIOS = ('login', 'dashboard', 'execute', 'admin_list')
+PASSWORD = 'benchpass'
+
+
+# --- Fake Sandbox --- #
+
+def make_fake_sandbox(base_ms, jitter_ms):
+    """Stand-in for execute_code_securely: the same code always takes the same time and prints the same output."""
+    def execute(language, code, input_data, limits=None):
+        digest = zlib.crc32(f'{language}\0{code}\0{input_data}'.encode())
+        elapsed = (base_ms + (digest % jitter_ms if jitter_ms else 0)) / 1000.0
+        time.sleep(elapsed)
+        return {'success': True, 'stdout': f'{digest:08x}\n', 'stderr': '', 'error_type': None,
+                'execution_time': elapsed, 'memory': 1024, 'exit_code': 0, 'cached': False}
+    return execute
+
+
+# --- Seeding --- #
+
+def _insert(db, model, rows, batch_size=2000):
+    for i in range(0, len(rows), batch_size):
+        db.session.execute(model.__table__.insert(), rows[i:i + batch_size])
+
+
+def seed(db, args):
+    """Bulk-insert the benchmark data set with explicit ids.
+
+    Returns ({'students', 'faculty', 'admins'} -> user ids, row counts per table).
+    """
+    from models import User, UserRole, Course, Enrollment, Assignment, Submission, Attendance
+    from passwords import hash_password
+    from summaries import rebuild_summaries
+    from leaderboard import rebuild_leaderboards
+
+    rng = random.Random(args.seed)
+    now = datetime.datetime.utcnow()
+    today = datetime.date.today()
+    password_hash = hash_password(PASSWORD) # One hash shared by all seeded users
+
+    faculty_count = max(1, args.courses // 5)
+    users, ids = [], {'students': [], 'faculty': [], 'admins': []}
+    for role, key, count in ((UserRole.STUDENT, 'students', args.users), (UserRole.FACULTY, 'faculty', faculty_count),
+                             (UserRole.ADMIN, 'admins', 1)):
+        for i in range(count):
+            user_id = len(users) + 1
+            users.append({'id': user_id, 'unique_id': f'BENCH{role.value[0].upper()}{i:06d}',
+                          'email': f'bench.{role.value}{i}@example.com', 'full_name': f'Bench {role.value.title()} {i}',
+                          'password_hash': password_hash, 'role': role, 'is_active': True,
+                          'created_at': now - datetime.timedelta(seconds=user_id)})
+            ids[key].append(user_id)
+    _insert(db, User, users)
+
+    _insert(db, Course, [{'id': c, 'course_code': f'BENCH{c:04d}', 'title': f'Bench Course {c}',
+                          'faculty_id': ids['faculty'][c % faculty_count], 'links': [], 'created_at': now}
+                         for c in range(1, args.courses + 1)])
+
+    enrollments, enrolled = [], {} # course id -> student ids
+    per_student = min(args.enrollments, args.courses)
+    for n, student_id in enumerate(ids['students']):
+        for k in range(per_student):
+            course_id = (n + k) % args.courses + 1
+            enrollments.append({'id': len(enrollments) + 1, 'student_id': student_id, 'course_id': course_id, 'enrolled_at': now})
+            enrolled.setdefault(course_id, []).append(student_id)
+    _insert(db, Enrollment, enrollments)
+
+    assignments = []
+    for course_id in range(1, args.courses + 1):
+        for k in range(args.assignments):
+            assignments.append({'id': len(assignments) + 1, 'course_id': course_id, 'title': f'Bench Assignment {course_id}.{k}',
+                                'description': None, 'due_date': today + datetime.timedelta(days=k * 7 - 14), 'created_at': now})
+    _insert(db, Assignment, assignments)
+
+    attendance = []
+    for course_id, students in enrolled.items():
+        for day in range(args.attendance_days):
+            date = today - datetime.timedelta(days=day)
+            attendance.extend({'student_id': sid, 'course_id': course_id, 'date': date, 'is_present': rng.random() < 0.85}
+                              for sid in students)
+    _insert(db, Attendance, attendance)
+
+    pairs = [(sid, a['id']) for a in assignments for sid in enrolled.get(a['course_id'], ())]
+    submissions = []
+    for n, (student_id, assignment_id) in enumerate(rng.sample(pairs, min(args.submissions, len(pairs)))):
+        graded = rng.random() < 0.5
+        submissions.append({'id': n + 1, 'student_id': student_id, 'assignment_id': assignment_id,
+                            'content': f'print({n})\n', 'submitted_at': now - datetime.timedelta(minutes=rng.randrange(20000)),
+                            'grade': f'{rng.randrange(40, 101)}/100' if graded else None,
+                            'graded_at': now if graded else None, 'review': None})
+    _insert(db, Submission, submissions)
+    db.session.commit()
+
+    # Core inserts skip the ORM listeners: derive summaries and leaderboards the way an operator would
+    rebuild_summaries()
+    rebuild_leaderboards()
+    return ids, {'users': len(users), 'courses': args.courses, 'enrollments': len(enrollments),
+                 'assignments': len(assignments), 'attendance': len(attendance), 'submissions': len(submissions)}
+
+
+# --- Runner --- #
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))] * 1000, 2)
+
+
+def run_scenario(app, total, concurrency, warmup, request_fn, ok_statuses=(200,)):
+    """Send total requests from concurrency threads. request_fn(client, i, state) returns a response.
+
+    Each thread has its own test client and state dict (tokens, ETags, cursors),
+    kept across an unmeasured warmup round of warmup requests.
+    """
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    clients = [(app.test_client(), {'worker': n}) for n in range(concurrency)]
+
+    def drive(indices, record):
+        def worker(client, state):
+            while True:
+                with lock:
+                    i = next(indices, None)
+                if i is None:
+                    return
+                started = time.perf_counter()
+                response = request_fn(client, i, state)
+                elapsed = time.perf_counter() - started
+                if record:
+                    with lock:
+                        latencies.append(elapsed)
+                        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        threads = [threading.Thread(target=worker, args=pair) for pair in clients]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    drive(iter(range(warmup)), record=False)
+    started = time.perf_counter()
+    drive(iter(range(warmup, warmup + total)), record=True)
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': sum(count for status, count in statuses.items() if status not in ok_statuses),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'seconds': round(wall, 3),
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else None,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+    }
+
+
+# --- Scenarios --- #
+
+def login_scenario(ids, tokens, args):
+    students = len(ids['students'])
+
+    def send(client, i, state):
+        n = i % students
+        identifier = f'bench.student{n}@example.com' if i % 2 else f'BENCHS{n:06d}'
+        return client.post('/api/login', json={'identifier': identifier, 'password': PASSWORD, 'role': 'student'})
+    return send, (200,)
+
+
+def dashboard_scenario(ids, tokens, args):
+    students = ids['students']
+
+    def send(client, i, state):
+        # Each poller follows one student at a time and revalidates with the last ETag it saw
+        student_id = students[(i // args.polls_per_user) % len(students)]
+        headers = {'Authorization': f'Bearer {tokens[student_id]}', 'Accept-Encoding': 'gzip'}
+        etag = state.get(student_id)
+        if etag:
+            headers['If-None-Match'] = etag
+        response = client.get('/api/student/dashboard_data', headers=headers)
+        if response.headers.get('ETag'):
+            state[student_id] = response.headers['ETag']
+        return response
+    return send, (200, 304)
+
+
+def execute_scenario(ids, tokens, args):
+    students = ids['students']
+    programs = [f'print(sum(range({k})))\n' for k in range(args.distinct_programs)]
+
+    def send(client, i, state):
+        student_id = students[state['worker'] % len(students)] # One user per thread, as in a lab session
+        return client.post('/api/execute', json={'language': 'python', 'code': programs[i % len(programs)], 'input': ''},
+                           headers={'Authorization': f'Bearer {tokens[student_id]}'})
+    return send, (200,)
+
+
+def admin_list_scenario(ids, tokens, args):
+    token = tokens[ids['admins'][0]]
+
+    def send(client, i, state):
+        query = f'/api/admin/users?limit={args.page_size}'
+        if state.get('cursor'):
+            query += f"&cursor={state['cursor']}"
+        response = client.get(query, headers={'Authorization': f'Bearer {token}'})
+        state['cursor'] = (response.get_json() or {}).get('nextCursor') if response.status_code == 200 else None
+        return response
+    return send, (200,)
+
+
+SCENARIO_BUILDERS = {
+    'login': login_scenario,
+    'dashboard': dashboard_scenario,
+    'execute': execute_scenario,
+    'admin_list': admin_list_scenario,
+}
+
+
+# --- Report --- #
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Ratios against a previous report: throughput > 1 and latency < 1 mean this run is faster."""
+    comparison = {}
+    for name, result in report['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        comparison[name] = {
+            key: round(result[key] / before[key], 3) if result.get(key) and before.get(key) else None
+            for key in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms')
+        }
+    return {'commit': baseline.get('commit'), 'ratios': comparison}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default=os.environ.get('BENCH_DATABASE_URL'),
+                        help='SQLAlchemy URI of an empty scratch database (default: temporary SQLite file)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"Comma separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument('--users', type=int, default=500, help='Seeded students')
+    parser.add_argument('--courses', type=int, default=20)
+    parser.add_argument('--enrollments', type=int, default=3, help='Courses per student')
+    parser.add_argument('--assignments', type=int, default=5, help='Assignments per course')
+    parser.add_argument('--submissions', type=int, default=2000)
+    parser.add_argument('--attendance-days', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=1000, help='Measured requests per scenario')
+    parser.add_argument('--login-requests', type=int, default=None, help='Override --requests for the bcrypt-bound login storm')
+    parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests before each scenario')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--polls-per-user', type=int, default=5, help='Consecutive dashboard polls for the same student')
+    parser.add_argument('--distinct-programs', type=int, default=50)
+    parser.add_argument('--sandbox-ms', type=float, default=20, help='Fake sandbox base run time')
+    parser.add_argument('--sandbox-jitter-ms', type=int, default=10, help='Fake sandbox extra time (fixed per program)')
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=None, help='bcrypt cost (default: Config.BCRYPT_LOG_ROUNDS)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=None, help='Also write the report to this file')
+    parser.add_argument('--baseline', default=None, help='Earlier report to compare against')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    # Point the app at the benchmark database (and lift per-user execution limits) before it is imported.
+    import config
+    db_file = None
+    if args.db:
+        config.Config.SQLALCHEMY_DATABASE_URI = args.db
+    else:
+        db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+        config.Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_file}'
+    if args.rounds:
+        config.Config.BCRYPT_LOG_ROUNDS = args.rounds
+    config.Config.EXECUTION_USER_RATE_PER_MINUTE = 0
+    config.Config.EXECUTION_USER_MAX_PENDING = max(config.Config.EXECUTION_USER_MAX_PENDING, args.concurrency)
+    config.Config.EXECUTION_QUEUE_SIZE = max(config.Config.EXECUTION_QUEUE_SIZE, args.concurrency * 2)
+
+    import app as app_module
+    from app import app, create_access_token
+    from database import db
+    from models import User
+
+    app_module.execute_code_securely = make_fake_sandbox(args.sandbox_ms, args.sandbox_jitter_ms)
+
+    try:
+        with app.app_context():
+            db.create_all()
+            if db.session.query(User.id).first() is not None:
+                sys.exit('The benchmark database already has users; point --db at an empty scratch database.')
+            started = time.perf_counter()
+            ids, counts = seed(db, args)
+            seed_seconds = time.perf_counter() - started
+            tokens = {user.id: create_access_token(user) for user in User.query.all()}
+            dialect = db.engine.dialect.name
+
+        report = {
+            'commit': git_commit(),
+            'timestamp': datetime.datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'python': sys.version.split()[0],
+            'database': dialect,
+            'concurrency': args.concurrency,
+            'bcrypt_rounds': config.Config.BCRYPT_LOG_ROUNDS,
+            'sandbox': {'base_ms': args.sandbox_ms, 'jitter_ms': args.sandbox_jitter_ms, 'pool_size': config.Config.SANDBOX_POOL_SIZE},
+            'seed': dict(counts, seed=args.seed, seconds=round(seed_seconds, 2)),
+            'scenarios': {},
+        }
+        for name in scenarios:
+            total = args.login_requests if name == 'login' and args.login_requests is not None else args.requests
+            request_fn, ok_statuses = SCENARIO_BUILDERS[name](ids, tokens, args)
+            report['scenarios'][name] = run_scenario(app, total, args.concurrency, args.warmup, request_fn, ok_statuses)
+            print(f"{name}: {report['scenarios'][name]['throughput_rps']} req/s", file=sys.stderr)
+
+        if args.baseline:
+            with open(args.baseline) as f:
+                report['baseline'] = compare(report, json.load(f))
+
+        output = json.dumps(report, indent=2)
+        print(output)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(output + '\n')
+    finally:
+        if db_file:
+            os.remove(db_file)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -16,14 +17,81 @@ class Config:
     DB_PORT = os.environ.get('DB_PORT') or '3306'
     DB_NAME = os.environ.get('DB_NAME') or 'campus_bridge_db' # CHANGE THIS IN .env
 
-    SQLALCHEMY_DATABASE_URI = (
+    # DATABASE_URL (any SQLAlchemy URI, e.g. sqlite:///campus_bridge.db) overrides the MySQL settings above
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or (
         f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
         f'?charset=utf8mb4'
     )
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pool, per engine and per process (see database.py)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 10) # Connections kept open
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW') or 20) # Extra connections opened under bursts, closed when returned
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT') or 10) # Seconds to wait for a free connection before failing
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or 1800) # Reconnect connections older than this (keep below MySQL wait_timeout)
+    DB_POOL_PRE_PING = (os.environ.get('DB_POOL_PRE_PING') or 'true').lower() == 'true' # Test connections on checkout (survives server restarts/idle drops)
+
+    # Optional read replica for @replica_reads endpoints (dashboards, profile, listings, exports)
+    REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL') # SQLAlchemy URI; unset sends everything to the primary
+    REPLICA_READ_YOUR_WRITES_SECONDS = float(os.environ.get('REPLICA_READ_YOUR_WRITES_SECONDS') or 5) # Reads stay on the primary this long after a user's write (set above the replica lag)
+
     # JWT Configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'your-fallback-jwt-secret' # Change this!
 
+    # Password hashing (see passwords.py)
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS') or 12) # Stored hashes with another cost are rehashed at login
+    BCRYPT_WORKERS = int(os.environ.get('BCRYPT_WORKERS') or os.cpu_count() or 2) # Threads dedicated to bcrypt
+    BCRYPT_IMPORT_WORKERS = int(os.environ.get('BCRYPT_IMPORT_WORKERS') or os.cpu_count() or 2) # Processes hashing bulk user imports
+
+    # Identity cache used by token_required (see identity_cache.py)
+    IDENTITY_CACHE_SIZE = int(os.environ.get('IDENTITY_CACHE_SIZE') or 10000) # Cached users per process (0 disables)
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL') or 60) # Seconds before a snapshot is reloaded
+    # 'local' (single process) or 'sqlite:///path/to/file.db' to share invalidations between workers on one host
+    IDENTITY_CACHE_BACKEND = os.environ.get('IDENTITY_CACHE_BACKEND') or 'local'
+    IDENTITY_CACHE_POLL_INTERVAL = float(os.environ.get('IDENTITY_CACHE_POLL_INTERVAL') or 0.25) # Seconds between backend polls
+
+    # Serialized dashboard_data responses (see response_cache.py); invalidations travel over IDENTITY_CACHE_BACKEND
+    DASHBOARD_CACHE_SIZE = int(os.environ.get('DASHBOARD_CACHE_SIZE') or 2000) # Cached payloads per process (0 disables)
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL') or 300) # Upper bound on staleness from writes outside this app (e.g. CLI rebuilds)
+
+    # Code Execution Sandbox (see sandbox_executor.py)
+    SANDBOX_POOL_SIZE = int(os.environ.get('SANDBOX_POOL_SIZE') or 16) # Concurrent runs per backend node
+    SANDBOX_CPU_TIME_LIMIT = float(os.environ.get('SANDBOX_CPU_TIME_LIMIT') or 2) # Seconds of CPU per run
+    SANDBOX_WALL_TIME_LIMIT = float(os.environ.get('SANDBOX_WALL_TIME_LIMIT') or 5) # Seconds of wall clock per run
+    SANDBOX_MEMORY_LIMIT_MB = int(os.environ.get('SANDBOX_MEMORY_LIMIT_MB') or 256)
+    SANDBOX_OUTPUT_LIMIT_BYTES = int(os.environ.get('SANDBOX_OUTPUT_LIMIT_BYTES') or 64 * 1024) # Per stream
+    SANDBOX_STREAM_LIMIT_BYTES = int(os.environ.get('SANDBOX_STREAM_LIMIT_BYTES') or 8 * 1024 * 1024) # Per stream when streaming over SSE
+    SANDBOX_COMPILE_TIME_LIMIT = float(os.environ.get('SANDBOX_COMPILE_TIME_LIMIT') or 10) # Seconds for gcc/javac
+    SANDBOX_WARM_PER_LANGUAGE = int(os.environ.get('SANDBOX_WARM_PER_LANGUAGE') or 1) # Idle Python/Node interpreters per worker (0 disables)
+    EXECUTION_QUEUE_SIZE = int(os.environ.get('EXECUTION_QUEUE_SIZE') or 500) # Pending async jobs before 503
+    EXECUTION_RESULT_TTL = int(os.environ.get('EXECUTION_RESULT_TTL') or 300) # Seconds a finished job stays pollable
+    EXECUTION_SYNC_WAIT_TIMEOUT = float(os.environ.get('EXECUTION_SYNC_WAIT_TIMEOUT') or 60) # Then a still-queued sync call gets 503 + Retry-After
+    EXECUTION_USER_MAX_RUNNING = int(os.environ.get('EXECUTION_USER_MAX_RUNNING') or 2) # Concurrent runs per user
+    EXECUTION_USER_MAX_PENDING = int(os.environ.get('EXECUTION_USER_MAX_PENDING') or 10) # Queued runs per user
+    EXECUTION_USER_RATE_PER_MINUTE = int(os.environ.get('EXECUTION_USER_RATE_PER_MINUTE') or 30) # Submissions per user (0 disables)
+    EXECUTION_CACHE_SIZE = int(os.environ.get('EXECUTION_CACHE_SIZE') or 2048) # Cached results (0 disables)
+    EXECUTION_CACHE_TTL = int(os.environ.get('EXECUTION_CACHE_TTL') or 600) # Seconds a cached result stays valid
+    EXECUTION_BATCH_MAX_CASES = int(os.environ.get('EXECUTION_BATCH_MAX_CASES') or 100) # Test cases per batch request
+    ARTIFACT_CACHE_DIR = os.environ.get('ARTIFACT_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'campus-bridge-artifacts')
+    ARTIFACT_CACHE_MAX_MB = int(os.environ.get('ARTIFACT_CACHE_MAX_MB') or 512) # Compiled binaries kept on disk (0 disables)
+
+    USER_IMPORT_CHUNK_SIZE = int(os.environ.get('USER_IMPORT_CHUNK_SIZE') or 500) # CSV rows validated, hashed and inserted together
+    ADMIN_USERS_PAGE_SIZE = int(os.environ.get('ADMIN_USERS_PAGE_SIZE') or 50) # Default page size of /api/admin/users
+    ADMIN_USERS_PAGE_MAX = int(os.environ.get('ADMIN_USERS_PAGE_MAX') or 200) # Largest ?limit= accepted
+    LEADERBOARD_SYNC_INTERVAL = float(os.environ.get('LEADERBOARD_SYNC_INTERVAL') or 2) # Seconds between polls for other processes' score changes (0 disables)
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE') or 500) # Rows fetched from the cursor and written per chunk in course exports
+    ATTENDANCE_MAX_ROSTER = int(os.environ.get('ATTENDANCE_MAX_ROSTER') or 2000) # Students per bulk attendance request
+
+    # Near-duplicate submission detection (see similarity.py)
+    SIMILARITY_THRESHOLD = float(os.environ.get('SIMILARITY_THRESHOLD') or 0.8) # Default estimated similarity (0-1) that flags a pair
+    SIMILARITY_MIN_TOKENS = int(os.environ.get('SIMILARITY_MIN_TOKENS') or 25) # Shorter submissions are never flagged (they all look alike)
+    SIMILARITY_SYNC_INTERVAL = float(os.environ.get('SIMILARITY_SYNC_INTERVAL') or 5) # Seconds between polls for other processes' signatures (0 disables)
+
+    # Instrumentation (see metrics.py)
+    METRICS_ENABLED = (os.environ.get('METRICS_ENABLED') or 'true').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') # If set, /metrics requires 'Authorization: Bearer <token>'
+    SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get('SLOW_REQUEST_THRESHOLD_MS') or 1000) # Slower requests are logged (0 disables)
+    SLOW_REQUEST_LOG = os.environ.get('SLOW_REQUEST_LOG') # File for the slow-request log (default: stderr)
+
     # Add other configurations as needed (e.g., mail server, API keys) 
\ No newline at end of file
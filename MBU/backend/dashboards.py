@@ -0,0 +1,113 @@
+# backend/dashboards.py
+
+from sqlalchemy import func, cast, Integer, and_
+
+from database import db
+from models import Course, Enrollment, Assignment, Submission, Attendance, StudentSummary
+from summaries import empty_summary, summary_badges, summary_current_streak
+
+# Dashboard payload builders. Each one runs a small, fixed number of aggregate
+# queries regardless of how many courses/assignments the user has: no per-course
+# or per-assignment queries inside loops. Headline stats (attendance, pending,
+# streaks, badges) come from the precomputed StudentSummary row.
+
+
+def _percentage(present, total):
+    return round(100 * present / total) if total else 0
+
+
+def build_student_dashboard(student):
+    """Build /api/student/dashboard_data for a student in four queries."""
+    # 1. Enrolled courses (links live on the course row)
+    courses = (
+        db.session.query(Course)
+        .join(Enrollment, Enrollment.course_id == Course.id)
+        .filter(Enrollment.student_id == student.id)
+        .order_by(Course.course_code)
+        .all()
+    )
+
+    # 2. Attendance totals per course, aggregated in the database
+    attendance_rows = (
+        db.session.query(
+            Attendance.course_id,
+            func.count(Attendance.id),
+            func.sum(cast(Attendance.is_present, Integer)),
+        )
+        .filter(Attendance.student_id == student.id)
+        .group_by(Attendance.course_id)
+        .all()
+    )
+    attendance_by_course = {course_id: (int(present or 0), total) for course_id, total, present in attendance_rows}
+
+    # 3. Assignments of enrolled courses with this student's submission (if any)
+    assignment_rows = (
+        db.session.query(
+            Assignment.id, Assignment.title, Assignment.due_date, Course.course_code,
+            Submission.id, Submission.grade, Submission.review,
+        )
+        .join(Enrollment, and_(Enrollment.course_id == Assignment.course_id, Enrollment.student_id == student.id))
+        .join(Course, Course.id == Assignment.course_id)
+        .outerjoin(Submission, and_(Submission.assignment_id == Assignment.id, Submission.student_id == student.id))
+        .order_by(Assignment.due_date, Assignment.id)
+        .all()
+    )
+
+    # 4. Precomputed summary (missing until the student has any activity)
+    summary = db.session.get(StudentSummary, student.id) or empty_summary(student.id)
+
+    detailed_attendance = []
+    for course in courses:
+        present, total = attendance_by_course.get(course.id, (0, 0))
+        detailed_attendance.append({
+            'course': course.display_name,
+            'code': course.course_code,
+            'percentage': _percentage(present, total),
+            'present': present,
+            'total': total,
+        })
+
+    assignments = []
+    for assignment_id, title, due_date, course_code, submission_id, grade, review in assignment_rows:
+        assignments.append({
+            'id': assignment_id,
+            'course': course_code,
+            'title': title,
+            'due': due_date.isoformat(),
+            'status': Submission.status_for(submission_id, grade),
+            'grade': grade or '-',
+            'review': review,
+        })
+    badges = summary_badges(summary)
+    current_streak = summary_current_streak(summary)
+
+    return {
+        'stats': {
+            'attendance': _percentage(summary.attendance_present, summary.attendance_total),
+            'pending': summary.pending_count,
+            'streak': current_streak,
+            'badges': len(badges),
+        },
+        'attendance': [{'course': a['code'], 'rate': f"{a['percentage']}%"} for a in detailed_attendance],
+        'detailedAttendance': detailed_attendance,
+        'courses': [{'id': c.id, 'name': c.display_name, 'links': c.links or []} for c in courses],
+        'assignments': assignments,
+        'profile': {
+            'name': student.full_name,
+            'id': student.unique_id,
+            'email': student.email,
+            'badges': badges,
+            'currentStreak': current_streak,
+            'longestStreak': summary.longest_streak
+        },
+        # Not modelled yet: coding tracks and job matches are still sample data
+        'codingTracks': [
+            { 'id': 'track1', 'name': 'DSA Essentials' },
+            { 'id': 'track2', 'name': 'Web Development (MERN)' },
+            { 'id': 'track3', 'name': 'Python for Data Science' },
+        ],
+        'jobMatches': [
+            { 'title': 'Junior Web Developer', 'skills': 'HTML, CSS, JS, React', 'match': '75%', 'detail': 'Strong in JS, Learning React' },
+            { 'title': 'Python Dev Intern', 'skills': 'Python, Algo, Git', 'match': '90%', 'detail': 'Excellent Python skills' },
+        ]
+    }
@@ -1,4 +1,211 @@
+# backend/database.py
+
+import time
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+from flask import g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, and_
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql.expression import Select, CompoundSelect
+
+# Read/write routing: endpoints marked with @replica_reads send their plain
+# SELECTs to the 'replica' bind (REPLICA_DATABASE_URL) when one is configured.
+# Everything else stays on the primary: writes, SELECT ... FOR UPDATE, reads made
+# after the session has written, and every read by a user who committed a write
+# in the last REPLICA_READ_YOUR_WRITES_SECONDS (so they see their own changes
+# despite replica lag; the pin is shared with other workers over
+# IDENTITY_CACHE_BACKEND). Code that must not see lag wraps reads in primary_reads().
+
+REPLICA_BIND = 'replica'
+
+
+class ReadYourWrites:
+    """Users pinned to the primary for `window` seconds after they commit a write."""
+
+    def __init__(self, window=5.0, backend=None):
+        self.window = window
+        self.backend = backend
+        self._pinned = {} # user id -> monotonic time the pin expires
+        self._lock = threading.Lock()
+
+    def pin(self, user_id, publish=True):
+        with self._lock:
+            self._pinned[user_id] = time.monotonic() + self.window
+        if publish and self.backend is not None:
+            self.backend.publish(user_id)
+
+    def is_pinned(self, user_id):
+        if self.backend is not None:
+            for remote_id in self.backend.poll():
+                self.pin(remote_id, publish=False)
+        with self._lock:
+            expires = self._pinned.get(user_id)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._pinned[user_id]
+                return False
+            return True
+
+
+read_your_writes = ReadYourWrites()
+
+
+def _is_plain_select(clause):
+    return isinstance(clause, (Select, CompoundSelect)) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends eligible reads to the replica bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or not _is_plain_select(clause):
+                self.info['wrote'] = True # Later reads in this session must see the write
+                self.info['pin_writer'] = True
+            elif self._replica_allowed():
+                replica = self._db.engines.get(REPLICA_BIND)
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica_allowed(self):
+        if not has_request_context() or not g.get('read_replica') or g.get('primary_reads'):
+            return False
+        if self.info.get('wrote'):
+            return False
+        user_id = g.get('current_user_id')
+        return user_id is None or not read_your_writes.is_pinned(user_id)
+
 
 # Initialize SQLAlchemy
-db = SQLAlchemy() 
\ No newline at end of file
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def replica_reads(f):
+    """Mark an endpoint as read-only: its plain SELECTs may go to the replica."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g.read_replica = True
+        return f(*args, **kwargs)
+    return decorated
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside this block, even in a @replica_reads endpoint."""
+    if not has_request_context():
+        yield
+        return
+    previous = g.get('primary_reads', False)
+    g.primary_reads = True
+    try:
+        yield
+    finally:
+        g.primary_reads = previous
+
+
+# --- Engines --- #
+
+def engine_options(uri, config):
+    """Pool settings for an engine on uri (in-memory SQLite keeps its single shared connection)."""
+    if uri.startswith('sqlite') and (uri in ('sqlite://', 'sqlite:///') or ':memory:' in uri or 'mode=memory' in uri):
+        return {}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+
+def init_database(app):
+    """Apply pool settings, add the replica bind if configured, and bind db to app."""
+    config = app.config
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(engine_options(config['SQLALCHEMY_DATABASE_URI'], config),
+                                               **config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    replica_uri = config.get('REPLICA_DATABASE_URL')
+    if replica_uri:
+        config['SQLALCHEMY_BINDS'] = dict(config.get('SQLALCHEMY_BINDS') or {},
+                                          **{REPLICA_BIND: dict(engine_options(replica_uri, config), url=replica_uri)})
+    db.init_app(app)
+
+    read_your_writes.window = config['REPLICA_READ_YOUR_WRITES_SECONDS']
+    if replica_uri:
+        from identity_cache import make_invalidation_backend # identity_cache imports models, which import this module
+        read_your_writes.backend = make_invalidation_backend(config['IDENTITY_CACHE_BACKEND'], config['IDENTITY_CACHE_POLL_INTERVAL'],
+                                                             channel='replica_pins')
+    return db
+
+
+# --- Upserts --- #
+# Rows that concurrent transactions may both create (per-student counters, board
+# scores, attendance marks) are written with one atomic INSERT ... ON CONFLICT /
+# ON DUPLICATE KEY statement, so the loser of a race updates instead of failing.
+
+_UPSERT_INSERTS = {'mysql': mysql.insert, 'mariadb': mysql.insert, 'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def upsert(connection, table, rows, keys, update=None):
+    """Insert rows into table; where a row with the same keys exists, apply update to it instead.
+
+    update maps column names to an expression over the existing row (e.g.
+    table.c.score + 1), or to None to take the value from the new row. Without
+    update, existing rows are left untouched. Dialects without an upsert fall back
+    to an UPDATE-then-INSERT per row, the INSERT in a savepoint.
+    """
+    if not rows:
+        return
+    update = update or {}
+    dialect = connection.dialect.name
+    if dialect not in _UPSERT_INSERTS:
+        for row in rows:
+            _merge_row(connection, table, row, keys, update)
+        return
+    stmt = _UPSERT_INSERTS[dialect](table).values(rows)
+    if dialect in ('mysql', 'mariadb'):
+        new = stmt.inserted
+        set_ = {name: new[name] if value is None else value for name, value in update.items()}
+        stmt = stmt.on_duplicate_key_update(set_ or {keys[0]: table.c[keys[0]]}) # No-op assignment when not updating
+    else:
+        new = stmt.excluded
+        set_ = {name: new[name] if value is None else value for name, value in update.items()}
+        stmt = stmt.on_conflict_do_update(index_elements=keys, set_=set_) if set_ else stmt.on_conflict_do_nothing(index_elements=keys)
+    connection.execute(stmt)
+
+
+def _merge_row(connection, table, row, keys, update):
+    match = and_(*(table.c[key] == row[key] for key in keys))
+    values = {name: row[name] if value is None else value for name, value in update.items()}
+
+    def apply_update():
+        return bool(values) and connection.execute(table.update().where(match).values(values)).rowcount
+
+    if apply_update():
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(table.insert().values(row))
+    except IntegrityError:
+        apply_update() # Inserted concurrently since the UPDATE
+
+
+# --- Read-Your-Writes Pins --- #
+# A committed transaction that wrote pins the acting user (set on g by token_required).
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _pin_writer(session):
+    if session.info.pop('pin_writer', False) and has_request_context() and g.get('current_user_id') is not None:
+        read_your_writes.pin(g.current_user_id)
+
+
+@event.listens_for(RoutingSession, 'after_soft_rollback')
+def _discard_rolled_back(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop('pin_writer', None)
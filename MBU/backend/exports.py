@@ -0,0 +1,96 @@
+# backend/exports.py
+
+import io
+import csv
+import json
+
+from sqlalchemy import select, and_
+
+from database import db
+from models import User, Enrollment, Assignment, Submission
+
+# Course exports stream one row per (enrolled student, assignment) straight from
+# a server-side cursor: rows are fetched batch_size at a time and written out as
+# they arrive, so memory stays flat however large the course. Source code is only
+# selected (and so only read from the database) when asked for.
+
+EXPORT_COLUMNS = ['student_id', 'student_name', 'email', 'assignment_id', 'assignment', 'due_date',
+                  'status', 'submitted_at', 'grade', 'graded_at', 'review']
+
+
+def _export_query(course_id, include_source):
+    columns = [
+        User.unique_id, User.full_name, User.email, Assignment.id, Assignment.title, Assignment.due_date,
+        Submission.id, Submission.submitted_at, Submission.grade, Submission.graded_at, Submission.review,
+    ]
+    if include_source:
+        columns.append(Submission.content)
+    return (
+        select(*columns)
+        .select_from(Enrollment)
+        .join(User, User.id == Enrollment.student_id)
+        .join(Assignment, Assignment.course_id == Enrollment.course_id)
+        .outerjoin(Submission, and_(Submission.assignment_id == Assignment.id, Submission.student_id == Enrollment.student_id))
+        .where(Enrollment.course_id == course_id)
+        .order_by(User.unique_id, Assignment.due_date, Assignment.id)
+    )
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def export_rows(course_id, include_source=False, batch_size=500):
+    """Yield export rows as dicts, fetching batch_size rows at a time from a server-side cursor."""
+    result = db.session.execute(
+        _export_query(course_id, include_source).execution_options(stream_results=True, yield_per=batch_size)
+    )
+    for row in result:
+        unique_id, name, email, assignment_id, title, due_date, submission_id, submitted_at, grade, graded_at, review = row[:11]
+        record = {
+            'student_id': unique_id,
+            'student_name': name,
+            'email': email,
+            'assignment_id': assignment_id,
+            'assignment': title,
+            'due_date': _iso(due_date),
+            'status': Submission.status_for(submission_id, grade),
+            'submitted_at': _iso(submitted_at),
+            'grade': grade,
+            'graded_at': _iso(graded_at),
+            'review': review,
+        }
+        if include_source:
+            record['source'] = row[11]
+        yield record
+
+
+def _batched(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_csv(rows, include_source=False, batch_size=500):
+    """Yield CSV text: the header, then one chunk per batch of rows."""
+    columns = EXPORT_COLUMNS + (['source'] if include_source else [])
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for batch in _batched(rows, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def stream_ndjson(rows, batch_size=500):
+    """Yield NDJSON text, one chunk per batch of rows."""
+    for batch in _batched(rows, batch_size):
+        yield ''.join(json.dumps(row) + '\n' for row in batch)
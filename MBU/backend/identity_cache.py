@@ -0,0 +1,205 @@
+# backend/identity_cache.py
+
+import os
+import time
+import sqlite3
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from cache import LRUCache
+from models import User
+
+
+class UserSnapshot:
+    """Detached, read-only view of a User row, safe to share between requests.
+
+    Carries what token_required/role_required and the read-only handlers need
+    (id, role, is_active, name and the profile fields of User.to_dict()) without
+    holding a database session. Load the User model when a handler needs to write.
+    """
+
+    __slots__ = ('id', 'unique_id', 'email', 'full_name', 'role', 'created_at', 'is_active')
+
+    def __init__(self, user):
+        self.id = user.id
+        self.unique_id = user.unique_id
+        self.email = user.email
+        self.full_name = user.full_name
+        self.role = user.role
+        self.created_at = user.created_at
+        self.is_active = user.is_active
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'unique_id': self.unique_id,
+            'email': self.email,
+            'full_name': self.full_name,
+            'role': self.role.value,
+            'created_at': self.created_at.isoformat(),
+            'is_active': self.is_active
+        }
+
+
+# --- Invalidation Backends --- #
+# A backend carries invalidations between processes. 'local' only reaches the
+# current process (single worker, or tests). 'sqlite:///path' is a shared local
+# stand-in for a pub/sub service: every gunicorn worker on the host appends to and
+# tails the same SQLite file.
+
+class LocalInvalidationBackend:
+    def publish(self, user_id):
+        pass
+
+    def poll(self):
+        return []
+
+
+class SQLiteInvalidationBackend:
+    RETENTION = 3600 # Seconds an invalidation record is kept for slow pollers
+
+    def __init__(self, path, poll_interval=0.25, channel='invalidations'):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.table = channel # One table per channel, so consumers don't see each other's messages
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._next_poll = 0.0
+        with self._connect() as conn:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS {self.table} '
+                         '(seq INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, created REAL NOT NULL)')
+            row = conn.execute(f'SELECT MAX(seq) FROM {self.table}').fetchone()
+        self._last_seq = row[0] or 0
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def publish(self, user_id):
+        now = time.time()
+        conn = self._connect()
+        conn.execute(f'INSERT INTO {self.table} (user_id, created) VALUES (?, ?)', (user_id, now))
+        conn.execute(f'DELETE FROM {self.table} WHERE created < ?', (now - self.RETENTION,))
+
+    def poll(self):
+        """Return user ids invalidated by any process since the last poll (rate limited)."""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_poll:
+                return []
+            self._next_poll = now + self.poll_interval
+            rows = self._connect().execute(
+                f'SELECT seq, user_id FROM {self.table} WHERE seq > ? ORDER BY seq', (self._last_seq,)).fetchall()
+            if rows:
+                self._last_seq = rows[-1][0]
+        return [user_id for _, user_id in rows]
+
+
+def make_invalidation_backend(url, poll_interval, channel='invalidations'):
+    if not url or url == 'local':
+        return LocalInvalidationBackend()
+    if url.startswith('sqlite:///'):
+        path = url[len('sqlite:///'):]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return SQLiteInvalidationBackend(path, poll_interval, channel)
+    raise ValueError(f'Unsupported identity cache backend: {url}')
+
+
+# --- Identity Cache --- #
+
+class IdentityCache:
+    """TTL/size-bounded cache of UserSnapshots keyed by user id."""
+
+    def __init__(self, maxsize, ttl, backend):
+        self._cache = LRUCache(maxsize, ttl=ttl)
+        self.backend = backend
+        self._generations = {} # user id -> invalidation count, so a load racing an invalidation isn't cached
+        self._lock = threading.Lock()
+
+    def _generation(self, user_id):
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def _drop(self, user_id):
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._cache.delete(user_id)
+
+    def _apply_remote_invalidations(self):
+        for user_id in self.backend.poll():
+            self._drop(user_id)
+
+    def get(self, user_id):
+        """Return the snapshot for user_id, loading it from the database on a miss (None if missing)."""
+        self._apply_remote_invalidations()
+        snapshot = self._cache.get(user_id)
+        if snapshot is None:
+            generation = self._generation(user_id)
+            user = User.query.get(user_id)
+            if user is None:
+                return None
+            snapshot = UserSnapshot(user)
+            with self._lock:
+                if self._generations.get(user_id, 0) == generation: # Not invalidated while loading
+                    self._cache.set(user_id, snapshot)
+        return snapshot
+
+    def invalidate(self, user_id):
+        """Drop user_id here and in every process sharing the backend."""
+        self._drop(user_id)
+        self.backend.publish(user_id)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+identity_cache = None
+
+
+def init_identity_cache(app):
+    """Create the process-wide identity cache from app config and hook User changes."""
+    global identity_cache
+    backend = make_invalidation_backend(app.config['IDENTITY_CACHE_BACKEND'], app.config['IDENTITY_CACHE_POLL_INTERVAL'])
+    identity_cache = IdentityCache(app.config['IDENTITY_CACHE_SIZE'], app.config['IDENTITY_CACHE_TTL'], backend)
+    return identity_cache
+
+
+# --- Change Tracking --- #
+# Fires on ORM flushes of User (role change, deactivation, rename, delete).
+# Changed ids are collected on the session and invalidated after commit: a
+# request reloading the user between flush and commit would otherwise cache
+# the pre-commit row again. Rolled-back changes are dropped.
+# Bulk Query.update()/delete() bypasses this: call identity_cache.invalidate() there.
+
+def _on_user_changed(mapper, connection, target):
+    if identity_cache is None or target.id is None:
+        return
+    session = object_session(target)
+    if session is None:
+        identity_cache.invalidate(target.id)
+        return
+    session.info.setdefault('identity_changes', set()).add(target.id)
+
+
+event.listen(User, 'after_update', _on_user_changed)
+event.listen(User, 'after_delete', _on_user_changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed(session):
+    changes = session.info.pop('identity_changes', None)
+    if changes and identity_cache is not None:
+        for user_id in changes:
+            identity_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_rolled_back(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop('identity_changes', None)
@@ -0,0 +1,304 @@
+# backend/job_queue.py
+
+import math
+import time
+import uuid
+import threading
+from collections import deque
+
+from metrics import SANDBOX_QUEUE_WAIT, SANDBOX_RUN
+
+# Strict priority between classes, highest first. Within a class, users share
+# the sandbox by fair queuing weighted by job cost (sandbox runs: 1, or the
+# number of test cases of a batch), so a 100-case batch counts as 100 runs.
+# The server assigns the class (see resolve_execution_priority in app.py).
+PRIORITY_CLASSES = ('contest', 'graded', 'practice')
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity. Carries a Retry-After hint in seconds."""
+
+    def __init__(self, retry_after, message='Execution queue is full'):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimitedError(QueueFullError):
+    """Raised when a single user exceeds their submission rate or pending-job cap."""
+
+    def __init__(self, retry_after, message='Too many executions. Please slow down.'):
+        super().__init__(retry_after, message)
+
+
+class FairScheduler:
+    """Bounded priority queue with per-user fair sharing, concurrency and rate caps.
+
+    Jobs are served strictly by class (PRIORITY_CLASSES order). Inside a class each
+    user has their own FIFO and the next job is the one with the smallest virtual
+    finish tag (start-time fair queuing; a job's tag advances by its cost), so a
+    user with 50 queued runs does not delay a user with one. A user never has
+    more than max_running jobs running, and submissions are throttled by a
+    per-user token bucket.
+    """
+
+    def __init__(self, max_pending, max_running_per_user, max_pending_per_user, rate_per_minute):
+        self.max_pending = max_pending
+        self.max_running_per_user = max_running_per_user
+        self.max_pending_per_user = max_pending_per_user
+        self.rate_per_minute = rate_per_minute
+        self._cond = threading.Condition()
+        self._classes = {name: {'users': {}, 'vtime': 0.0} for name in PRIORITY_CLASSES}
+        self._last_finish = {} # (class, user) -> virtual finish tag of their last queued job
+        self._running = {} # user -> running job count
+        self._user_pending = {} # user -> queued job count
+        self._buckets = {} # user -> [tokens, last refill time]
+        self._pending = 0
+        self._waits = {name: deque(maxlen=1000) for name in PRIORITY_CLASSES}
+        self._dispatched = {name: 0 for name in PRIORITY_CLASSES}
+
+    def _take_token(self, user_id, now):
+        if self.rate_per_minute <= 0:
+            return 0
+        capacity = float(self.rate_per_minute)
+        tokens, last = self._buckets.get(user_id, (capacity, now))
+        tokens = min(capacity, tokens + (now - last) * capacity / 60.0)
+        if tokens < 1:
+            self._buckets[user_id] = (tokens, now)
+            return math.ceil((1 - tokens) * 60.0 / capacity)
+        self._buckets[user_id] = (tokens - 1, now)
+        return 0
+
+    def put(self, user_id, priority, item, cost=1):
+        """Queue item (costing cost sandbox runs) for user_id. Raises RateLimitedError or QueueFullError."""
+        if priority not in self._classes:
+            raise ValueError(f'Unknown priority class: {priority}')
+        now = time.monotonic()
+        with self._cond:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(0)
+            if self._user_pending.get(user_id, 0) >= self.max_pending_per_user:
+                raise RateLimitedError(1, 'Too many queued executions. Wait for your earlier runs to finish.')
+            retry_after = self._take_token(user_id, now)
+            if retry_after:
+                raise RateLimitedError(retry_after)
+
+            cls = self._classes[priority]
+            start = max(cls['vtime'], self._last_finish.get((priority, user_id), 0.0))
+            finish = start + cost
+            self._last_finish[(priority, user_id)] = finish
+            cls['users'].setdefault(user_id, deque()).append((start, finish, now, item))
+            self._user_pending[user_id] = self._user_pending.get(user_id, 0) + 1
+            self._pending += 1
+            self._cond.notify()
+
+    def _pick(self):
+        for name in PRIORITY_CLASSES:
+            cls = self._classes[name]
+            best = None
+            for user_id, jobs in cls['users'].items():
+                if self._running.get(user_id, 0) >= self.max_running_per_user:
+                    continue
+                if best is None or jobs[0][1] < cls['users'][best][0][1]:
+                    best = user_id
+            if best is not None:
+                return name, best
+        return None
+
+    def get(self):
+        """Block until a job is eligible to run. Returns (user_id, priority, item)."""
+        with self._cond:
+            while True:
+                picked = self._pick()
+                if picked:
+                    break
+                self._cond.wait()
+            name, user_id = picked
+            cls = self._classes[name]
+            jobs = cls['users'][user_id]
+            start, _, enqueued_at, item = jobs.popleft()
+            if not jobs:
+                del cls['users'][user_id]
+            if not cls['users']:
+                # Class drained: reset virtual time so tags stay small
+                cls['vtime'] = 0.0
+                for key in [k for k in self._last_finish if k[0] == name]:
+                    del self._last_finish[key]
+            else:
+                cls['vtime'] = start
+            self._pending -= 1
+            self._user_pending[user_id] -= 1
+            if not self._user_pending[user_id]:
+                del self._user_pending[user_id]
+            self._running[user_id] = self._running.get(user_id, 0) + 1
+            self._waits[name].append(time.monotonic() - enqueued_at)
+            self._dispatched[name] += 1
+            return user_id, name, item
+
+    def done(self, user_id):
+        """Mark one of user_id's running jobs as finished."""
+        with self._cond:
+            self._running[user_id] -= 1
+            if not self._running[user_id]:
+                del self._running[user_id]
+            self._cond.notify_all()
+
+    def remove(self, user_id, priority, item):
+        """Withdraw a queued item before it is dispatched. Returns False if it is no longer queued."""
+        with self._cond:
+            jobs = self._classes[priority]['users'].get(user_id)
+            entry = next((job for job in jobs or () if job[3] == item), None)
+            if entry is None:
+                return False
+            jobs.remove(entry)
+            if not jobs:
+                del self._classes[priority]['users'][user_id]
+            self._pending -= 1
+            self._user_pending[user_id] -= 1
+            if not self._user_pending[user_id]:
+                del self._user_pending[user_id]
+            return True
+
+    def pending(self):
+        with self._cond:
+            return self._pending
+
+    def stats(self):
+        with self._cond:
+            classes = {}
+            for name in PRIORITY_CLASSES:
+                waits = sorted(self._waits[name])
+                classes[name] = {
+                    'depth': sum(len(jobs) for jobs in self._classes[name]['users'].values()),
+                    'users': len(self._classes[name]['users']),
+                    'dispatched': self._dispatched[name],
+                    'avg_wait': round(sum(waits) / len(waits), 4) if waits else 0.0,
+                    'p95_wait': round(waits[int(len(waits) * 0.95)], 4) if waits else 0.0,
+                }
+            return {
+                'pending': self._pending,
+                'capacity': self.max_pending,
+                'running': sum(self._running.values()),
+                'classes': classes,
+            }
+
+
+class ExecutionJobQueue:
+    """Execution jobs served from a FairScheduler by a fixed set of dispatcher threads.
+
+    Jobs are submitted with submit() and either awaited with wait() or polled with
+    get(). Finished results are kept for result_ttl seconds so clients can fetch
+    them, then dropped.
+    """
+
+    def __init__(self, workers, max_pending, max_running_per_user, max_pending_per_user,
+                 rate_per_minute, result_ttl=300):
+        self.scheduler = FairScheduler(max_pending, max_running_per_user, max_pending_per_user, rate_per_minute)
+        self._workers = workers
+        self._result_ttl = result_ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._avg_run_time = 1.0 # Exponential moving average, used for Retry-After
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self._workers):
+                t = threading.Thread(target=self._dispatch, name=f'exec-dispatch-{i}', daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _dispatch(self):
+        while True:
+            user_id, _, job_id = self.scheduler.get()
+            with self._lock:
+                job = self._jobs[job_id]
+                job['status'] = 'running'
+                job['started_at'] = time.time()
+            try:
+                result = job['fn'](*job['args'])
+            except Exception as e:
+                print(f"Execution job {job_id} failed: {e}")
+                result = {'success': False, 'stdout': '', 'stderr': f'Code execution failed on server: {e}', 'error_type': 'sandbox'}
+            finally:
+                self.scheduler.done(user_id)
+            finished = time.time()
+            with self._lock:
+                job.update(status='done', result=result, finished_at=finished, fn=None, args=None)
+                self._avg_run_time = 0.8 * self._avg_run_time + 0.2 * (finished - job['started_at'])
+            SANDBOX_QUEUE_WAIT.observe(job['started_at'] - job['submitted_at'], job['priority'])
+            SANDBOX_RUN.observe(finished - job['started_at'], job['priority'])
+            job['event'].set()
+
+    def _expire(self, now):
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['status'] == 'done' and now - job['finished_at'] > self._result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def retry_after(self):
+        """Estimated seconds until a queue slot frees up."""
+        backlog = self.scheduler.pending() + self._workers
+        return max(1, math.ceil(backlog / self._workers * self._avg_run_time))
+
+    def submit(self, owner_id, priority, fn, *args, cost=1):
+        """Queue fn(*args) for owner_id and return the job id.
+
+        cost is the job's weight in fair queuing (sandbox runs it will make).
+
+        Raises QueueFullError when the queue is at capacity, or RateLimitedError
+        when owner_id is over their rate or pending-job cap.
+        """
+        self._ensure_started()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            self._jobs[job_id] = {
+                'status': 'queued', 'owner_id': owner_id, 'priority': priority, 'submitted_at': now,
+                'result': None, 'fn': fn, 'args': args, 'event': threading.Event(),
+            }
+        try:
+            self.scheduler.put(owner_id, priority, job_id, cost=cost)
+        except QueueFullError as e:
+            with self._lock:
+                del self._jobs[job_id]
+            if not isinstance(e, RateLimitedError):
+                e.retry_after = self.retry_after()
+            raise
+        return job_id
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job finishes. Returns its result, or None on timeout."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or not job['event'].wait(timeout):
+            return None
+        return job['result']
+
+    def cancel(self, job_id):
+        """Drop a job that has not started yet. Returns False if it is running or done."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or not self.scheduler.remove(job['owner_id'], job['priority'], job_id):
+            return False
+        with self._lock:
+            self._jobs.pop(job_id, None)
+        return True
+
+    def get(self, job_id, owner_id):
+        """Return a snapshot of the job for its owner, or None if unknown/expired."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['owner_id'] != owner_id:
+                return None
+            snapshot = {'job_id': job_id, 'status': job['status'], 'priority': job['priority']}
+            if job['status'] == 'done':
+                snapshot['result'] = job['result']
+            return snapshot
+
+    def stats(self):
+        with self._lock:
+            jobs = len(self._jobs)
+        return dict(self.scheduler.stats(), jobs=jobs)
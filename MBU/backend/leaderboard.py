@@ -0,0 +1,387 @@
+# backend/leaderboard.py
+
+import re
+import time
+import datetime
+import threading
+from bisect import bisect_left, insort
+
+from sqlalchemy import event, select, func
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import get_history
+
+from database import db, primary_reads, upsert
+from models import User, Assignment, Submission, LeaderboardScore
+
+# Leaderboards: every board ('global', 'contest:<id>') is a student -> score map
+# plus a sorted index of (-score, student_id), so updates, top-K and "my rank" are
+# O(log n) and never scan the table. Scores are persisted in leaderboard_scores
+# (updated in the grading transaction); a process loads a board from there on
+# first use, applies its own changes after commit, and picks up other processes'
+# changes by polling rows updated since its last sync.
+
+GLOBAL_BOARD = 'global'
+
+LETTER_POINTS = {'A+': 100, 'A': 95, 'A-': 90, 'B+': 85, 'B': 80, 'B-': 75, 'C+': 70, 'C': 65, 'C-': 60,
+                 'D': 50, 'E': 40, 'F': 0, 'O': 100, 'S': 95}
+_FRACTION = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*/\s*(\d+(?:\.\d+)?)\s*$')
+_NUMBER = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*%?\s*$')
+
+
+def grade_points(grade):
+    """Leaderboard points (0-100) for a grade: '85/100', '85', '85%' or a letter ('A', 'B+')."""
+    if grade is None:
+        return 0
+    match = _FRACTION.match(grade)
+    if match:
+        earned, total = float(match.group(1)), float(match.group(2))
+        return round(100 * earned / total) if total else 0
+    match = _NUMBER.match(grade)
+    if match:
+        return min(100, round(float(match.group(1))))
+    return LETTER_POINTS.get(grade.strip().upper(), 0)
+
+
+def contest_board(contest_id):
+    return f'contest:{contest_id}'
+
+
+# --- Sorted Index --- #
+
+class SortedIndex:
+    """Sorted list of unique keys with O(log n) add/remove/rank.
+
+    Keys are kept in sorted sublists of at most 2 * LOAD entries; a Fenwick tree
+    over the sublist lengths maps a sublist to its global position, so neither
+    rank nor positional reads walk the list.
+    """
+
+    LOAD = 256
+
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        self._lists = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._maxes = [sub[-1] for sub in self._lists]
+        self._len = len(keys)
+        self._build_tree()
+
+    def __len__(self):
+        return self._len
+
+    def _build_tree(self):
+        tree = [0] + [len(sub) for sub in self._lists]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, index, delta):
+        index += 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    def _prefix(self, index):
+        """Number of keys in sublists before self._lists[index]."""
+        total = 0
+        while index > 0:
+            total += self._tree[index]
+            index -= index & -index
+        return total
+
+    def _locate(self, position):
+        """(sublist index, offset) of the key at position (Fenwick descent)."""
+        index, step = 0, 1 << (len(self._tree).bit_length())
+        while step:
+            nxt = index + step
+            if nxt < len(self._tree) and self._tree[nxt] <= position:
+                index = nxt
+                position -= self._tree[nxt]
+            step >>= 1
+        return index, position
+
+    def add(self, key):
+        if not self._lists:
+            self._lists, self._maxes = [[key]], [key]
+            self._len = 1
+            self._build_tree()
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+            self._lists[i].append(key)
+            self._maxes[i] = key
+        else:
+            insort(self._lists[i], key)
+        self._len += 1
+        sub = self._lists[i]
+        if len(sub) > 2 * self.LOAD:
+            self._lists[i:i + 1] = [sub[:self.LOAD], sub[self.LOAD:]]
+            self._maxes[i:i + 1] = [sub[self.LOAD - 1], sub[-1]]
+            self._build_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, key):
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            raise KeyError(key)
+        sub = self._lists[i]
+        j = bisect_left(sub, key)
+        if j == len(sub) or sub[j] != key:
+            raise KeyError(key)
+        del sub[j]
+        self._len -= 1
+        if sub:
+            self._maxes[i] = sub[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._lists[i], self._maxes[i]
+            self._build_tree()
+
+    def bisect_left(self, key):
+        """Number of keys < key."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return self._len
+        return self._prefix(i) + bisect_left(self._lists[i], key)
+
+    def slice(self, start, stop):
+        """Keys at positions [start, stop)."""
+        stop = min(stop, self._len)
+        if start >= stop:
+            return []
+        i, j = self._locate(start)
+        out = []
+        while len(out) < stop - start:
+            sub = self._lists[i]
+            out.extend(sub[j:j + stop - start - len(out)])
+            i, j = i + 1, 0
+        return out
+
+
+# --- Boards --- #
+
+class Leaderboard:
+    """One board. Ranks are competition style: tied scores share a rank."""
+
+    def __init__(self, scores=None):
+        self._lock = threading.RLock()
+        self._scores = dict(scores or {})
+        self._index = SortedIndex((-score, student_id) for student_id, score in self._scores.items())
+        self.synced_at = None # Newest updated_at seen from the database
+        self.next_poll = 0.0
+
+    def __len__(self):
+        return len(self._scores)
+
+    def set_score(self, student_id, score):
+        with self._lock:
+            old = self._scores.get(student_id)
+            if old == score:
+                return
+            if old is not None:
+                self._index.remove((-old, student_id))
+            self._scores[student_id] = score
+            self._index.add((-score, student_id))
+
+    def add_points(self, student_id, delta):
+        with self._lock:
+            self.set_score(student_id, self._scores.get(student_id, 0) + delta)
+
+    def _rank_of_score(self, score):
+        return self._index.bisect_left((-score, float('-inf'))) + 1
+
+    def rank(self, student_id):
+        """(rank, score) for student_id, or None if they have no score on this board."""
+        with self._lock:
+            score = self._scores.get(student_id)
+            if score is None:
+                return None
+            return self._rank_of_score(score), score
+
+    def top(self, limit, offset=0):
+        """[(rank, student_id, score), ...] for positions offset .. offset + limit."""
+        with self._lock:
+            entries = self._index.slice(offset, offset + limit)
+            out = []
+            for position, (neg_score, student_id) in enumerate(entries, start=offset):
+                score = -neg_score
+                if not out:
+                    rank = self._rank_of_score(score) # The page may start inside a tie
+                elif out[-1][2] == score:
+                    rank = out[-1][0]
+                else:
+                    rank = position + 1
+                out.append((rank, student_id, score))
+            return out
+
+
+class LeaderboardRegistry:
+    """Process-wide boards, loaded lazily from leaderboard_scores and kept in sync."""
+
+    SYNC_OVERLAP = datetime.timedelta(seconds=5) # Re-read rows this far back to catch late commits
+
+    def __init__(self, sync_interval=2.0):
+        self.sync_interval = sync_interval
+        self._boards = {}
+        self._lock = threading.Lock()
+
+    def _load(self, name):
+        rows = db.session.execute(
+            select(LeaderboardScore.student_id, LeaderboardScore.score).where(LeaderboardScore.board == name)
+        ).all()
+        board = Leaderboard({student_id: score for student_id, score in rows})
+        board.synced_at = db.session.execute(
+            select(func.max(LeaderboardScore.updated_at)).where(LeaderboardScore.board == name)
+        ).scalar()
+        board.next_poll = time.monotonic() + self.sync_interval
+        return board
+
+    def _sync(self, name, board):
+        """Apply rows other processes changed since the last sync (absolute scores, so idempotent)."""
+        now = time.monotonic()
+        if not self.sync_interval or now < board.next_poll:
+            return
+        board.next_poll = now + self.sync_interval
+        query = select(LeaderboardScore.student_id, LeaderboardScore.score, LeaderboardScore.updated_at) \
+            .where(LeaderboardScore.board == name)
+        if board.synced_at is not None:
+            query = query.where(LeaderboardScore.updated_at >= board.synced_at - self.SYNC_OVERLAP)
+        for student_id, score, updated_at in db.session.execute(query):
+            board.set_score(student_id, score)
+            if board.synced_at is None or updated_at > board.synced_at:
+                board.synced_at = updated_at
+
+    def get(self, name):
+        """The named board, loading it from the database on first use."""
+        with self._lock:
+            board = self._boards.get(name)
+        with primary_reads(): # Polling by updated_at must not miss rows a lagging replica hasn't applied yet
+            if board is None:
+                loaded = self._load(name)
+                with self._lock:
+                    board = self._boards.setdefault(name, loaded)
+            else:
+                self._sync(name, board)
+        return board
+
+    def apply(self, deltas):
+        """Apply committed {(board, student_id): delta} to boards already in memory."""
+        with self._lock:
+            boards = dict(self._boards)
+        for (name, student_id), delta in deltas.items():
+            if name in boards:
+                boards[name].add_points(student_id, delta)
+
+    def reset(self):
+        with self._lock:
+            self._boards.clear()
+
+
+leaderboards = LeaderboardRegistry()
+
+
+def init_leaderboards(app):
+    leaderboards.sync_interval = app.config['LEADERBOARD_SYNC_INTERVAL']
+    return leaderboards
+
+
+def board_page(name, limit, offset=0, student_id=None):
+    """Top entries of a board with names, plus the given student's own rank."""
+    board = leaderboards.get(name)
+    top = board.top(limit, offset)
+    names = dict(db.session.execute(
+        select(User.id, User.full_name).where(User.id.in_([sid for _, sid, _ in top]))
+    ).all()) if top else {}
+    page = {
+        'board': name,
+        'size': len(board),
+        'top': [{'rank': rank, 'studentId': sid, 'name': names.get(sid), 'score': score} for rank, sid, score in top],
+    }
+    if student_id is not None:
+        mine = board.rank(student_id)
+        page['me'] = {'rank': mine[0], 'score': mine[1]} if mine else None
+    return page
+
+
+# --- Grading Hooks --- #
+# Grade changes adjust the persisted scores in the grading transaction. The
+# in-memory deltas are parked on the session and applied only after commit.
+
+def _boards_for(connection, assignment_id):
+    contest_id = connection.execute(select(Assignment.contest_id).where(Assignment.id == assignment_id)).scalar()
+    return [GLOBAL_BOARD] + ([contest_board(contest_id)] if contest_id is not None else [])
+
+
+def _record(connection, target, delta):
+    if not delta:
+        return
+    table = LeaderboardScore.__table__
+    now = datetime.datetime.utcnow()
+    session = object_session(target)
+    pending = session.info.setdefault('leaderboard_deltas', {}) if session is not None else {}
+    for name in _boards_for(connection, target.assignment_id):
+        # One atomic upsert: two workers recording a student's first score on a board must not race on the INSERT
+        upsert(connection, table, [{'board': name, 'student_id': target.student_id, 'score': delta, 'updated_at': now}],
+               ['board', 'student_id'], {'score': table.c.score + delta, 'updated_at': None})
+        key = (name, target.student_id)
+        pending[key] = pending.get(key, 0) + delta
+
+
+@event.listens_for(Submission, 'after_insert')
+def _graded_on_insert(mapper, connection, target):
+    _record(connection, target, grade_points(target.grade))
+
+
+@event.listens_for(Submission, 'after_update')
+def _regraded(mapper, connection, target):
+    history = get_history(target, 'grade')
+    if history.has_changes():
+        old = history.deleted[0] if history.deleted else None
+        _record(connection, target, grade_points(target.grade) - grade_points(old))
+
+
+@event.listens_for(Submission, 'after_delete')
+def _ungraded(mapper, connection, target):
+    _record(connection, target, -grade_points(target.grade))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed(session):
+    deltas = session.info.pop('leaderboard_deltas', None)
+    if deltas:
+        leaderboards.apply(deltas)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_rolled_back(session, previous_transaction):
+    if not previous_transaction.nested: # A savepoint rollback leaves earlier changes to commit
+        session.info.pop('leaderboard_deltas', None)
+
+
+# --- Rebuild --- #
+
+def rebuild_leaderboards(batch_size=5000):
+    """Recompute every board from graded submissions and reload them. Returns the board count."""
+    totals = {}
+    rows = db.session.execute(
+        select(Submission.student_id, Submission.grade, Assignment.contest_id)
+        .join(Assignment, Assignment.id == Submission.assignment_id)
+        .where(Submission.grade.is_not(None))
+        .execution_options(yield_per=batch_size)
+    )
+    for student_id, grade, contest_id in rows:
+        points = grade_points(grade)
+        for name in [GLOBAL_BOARD] + ([contest_board(contest_id)] if contest_id is not None else []):
+            totals[(name, student_id)] = totals.get((name, student_id), 0) + points
+
+    now = datetime.datetime.utcnow()
+    db.session.execute(LeaderboardScore.__table__.delete())
+    values = [{'board': name, 'student_id': sid, 'score': score, 'updated_at': now} for (name, sid), score in totals.items()]
+    for i in range(0, len(values), batch_size):
+        db.session.execute(LeaderboardScore.__table__.insert(), values[i:i + batch_size])
+    db.session.commit()
+    leaderboards.reset()
+    return len({name for name, _ in totals})
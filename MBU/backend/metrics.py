@@ -0,0 +1,181 @@
+# backend/metrics.py
+
+import sys
+import time
+import logging
+import threading
+
+from flask import g, request, has_request_context
+from sqlalchemy import event
+
+# In-process metrics rendered in the Prometheus text format at /metrics.
+# Counters and histograms are per process (each gunicorn worker reports its
+# own; scrape them individually or aggregate by instance). Request hooks time
+# every request by route template and role, and count its SQL statements and
+# SQL time through cursor events on the SQLAlchemy engine.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labelnames, labelvalues)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {} # label values -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, *labelvalues):
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labelvalues, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), series):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{_labels(self.labelnames, labelvalues, [("le", bound)])} {cumulative}')
+                lines.append(f'{self.name}_sum{_labels(self.labelnames, labelvalues)} {series[-1]:.6f}')
+                lines.append(f'{self.name}_count{_labels(self.labelnames, labelvalues)} {cumulative}')
+        return lines
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# --- Metric Definitions --- #
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Request latency (to first byte for streamed responses).',
+                            ('route', 'method', 'role', 'status'))
+REQUEST_SQL_QUERIES = Histogram('http_request_sql_queries', 'SQL statements executed per request.',
+                                ('route', 'method'), buckets=QUERY_COUNT_BUCKETS)
+REQUEST_SQL_SECONDS = Histogram('http_request_sql_seconds', 'Time spent in SQL per request.', ('route', 'method'))
+SQL_QUERIES = Counter('sql_queries_total', 'SQL statements executed (in and outside requests).')
+SLOW_REQUESTS = Counter('http_slow_requests_total', 'Requests slower than SLOW_REQUEST_THRESHOLD_MS.', ('route', 'method'))
+SANDBOX_QUEUE_WAIT = Histogram('sandbox_queue_wait_seconds', 'Time an execution job waited in the queue.', ('priority',))
+SANDBOX_RUN = Histogram('sandbox_run_seconds', 'Time an execution job ran in the sandbox.', ('priority',))
+BCRYPT_SECONDS = Histogram('bcrypt_seconds', 'bcrypt hashing/verification time, including pool wait.', ('operation',))
+
+slow_log = logging.getLogger('campus_bridge.slow_requests')
+
+
+# --- Hooks --- #
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    SQL_QUERIES.inc()
+    if has_request_context() and 'metrics_started' in g:
+        g.sql_queries += 1
+        g.sql_seconds += elapsed
+        if elapsed > g.slowest_sql[0]:
+            g.slowest_sql = (elapsed, statement)
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute: drop its start time
+    if context.connection is not None and context.connection.info.get('query_start'):
+        context.connection.info['query_start'].pop()
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.sql_queries = 0
+    g.sql_seconds = 0.0
+    g.slowest_sql = (0.0, None)
+
+
+def _after_request_factory(app):
+    threshold = app.config['SLOW_REQUEST_THRESHOLD_MS'] / 1000.0
+
+    def _after_request(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        role = g.get('current_user_role') or 'anonymous'
+        REQUEST_LATENCY.observe(elapsed, route, request.method, role, str(response.status_code))
+        REQUEST_SQL_QUERIES.observe(g.sql_queries, route, request.method)
+        REQUEST_SQL_SECONDS.observe(g.sql_seconds, route, request.method)
+        if threshold and elapsed >= threshold:
+            SLOW_REQUESTS.inc(1, route, request.method)
+            slowest_time, slowest_statement = g.slowest_sql
+            slow_log.warning(
+                'Slow request: %s %s (%s) %d in %.0f ms, role=%s, %d queries / %.0f ms SQL, slowest %.0f ms: %s',
+                request.method, request.path, route, response.status_code, elapsed * 1000, role,
+                g.sql_queries, g.sql_seconds * 1000, slowest_time * 1000, ' '.join((slowest_statement or '-').split())[:300],
+            )
+        return response
+
+    return _after_request
+
+
+def init_metrics(app, db):
+    """Register request timing hooks and SQL accounting on db's engines (primary and replica)."""
+    if not app.config['METRICS_ENABLED']:
+        return
+    handler = logging.FileHandler(app.config['SLOW_REQUEST_LOG']) if app.config['SLOW_REQUEST_LOG'] else logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    slow_log.addHandler(handler)
+    slow_log.setLevel(logging.WARNING)
+    slow_log.propagate = False
+
+    app.before_request(_before_request)
+    app.after_request(_after_request_factory(app))
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(engine, 'handle_error', _handle_error)
@@ -1,5 +1,5 @@
 from database import db
-from flask_bcrypt import generate_password_hash, check_password_hash
+from passwords import hash_password, verify_password, needs_rehash
 import enum
 import datetime
 
@@ -22,18 +22,36 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True) # For activate/deactivate
 
-    def __init__(self, unique_id, email, full_name, password, role=UserRole.STUDENT):
+    # Admin listing: keyset pages on (created_at, id), optionally filtered by role and/or is_active;
+    # prefix search scans full_name here plus the unique indexes on email and unique_id
+    __table_args__ = (
+        db.Index('ix_users_created_id', 'created_at', 'id'),
+        db.Index('ix_users_role_created_id', 'role', 'created_at', 'id'),
+        db.Index('ix_users_role_active_created_id', 'role', 'is_active', 'created_at', 'id'),
+        db.Index('ix_users_active_created_id', 'is_active', 'created_at', 'id'),
+        db.Index('ix_users_full_name', 'full_name'),
+    )
+
+    def __init__(self, unique_id, email, full_name, password=None, role=UserRole.STUDENT, is_active=True, password_hash=None):
         self.unique_id = unique_id
         self.email = email.lower()
         self.full_name = full_name
-        self.set_password(password)
+        if password_hash is not None: # Already hashed (e.g. in bulk, off the request thread)
+            self.password_hash = password_hash
+        else:
+            self.set_password(password)
         self.role = role
+        self.is_active = is_active
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password).decode('utf8')
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """True when the stored hash's bcrypt cost differs from Config.BCRYPT_LOG_ROUNDS."""
+        return needs_rehash(self.password_hash)
 
     def to_dict(self):
         """Return user data in a dictionary format suitable for JSON serialization."""
@@ -47,30 +65,148 @@ class User(db.Model):
             'is_active': self.is_active
         }
 
-# --- Add more models as needed --- #
-
-# Example: Course Model
-# class Course(db.Model):
-#     __tablename__ = 'courses'
-#     id = db.Column(db.Integer, primary_key=True)
-#     course_code = db.Column(db.String(20), unique=True, nullable=False)
-#     title = db.Column(db.String(150), nullable=False)
-#     faculty_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True) # Link to faculty user
-#     faculty = db.relationship('User')
-#
-# Example: Assignment Model
-# class Assignment(db.Model):
-#     __tablename__ = 'assignments'
-#     # ... columns for title, description, due_date, course_id (FK to courses)
-#
-# Example: Submission Model
-# class Submission(db.Model):
-#     __tablename__ = 'submissions'
-#     # ... columns for student_id (FK to users), assignment_id (FK to assignments), content, submitted_at, grade, review
-#
-# Example: Attendance Model
-# class Attendance(db.Model):
-#     __tablename__ = 'attendance'
-#     # ... columns for student_id, course_id, date, is_present (boolean)
-
-# ... etc. for Content, Events, etc. 
\ No newline at end of file
+# --- Academic Models --- #
+# Composite indexes follow the dashboard access paths: a student's rows per
+# course (student_id, course_id ...) and a course's rows by date/due date.
+
+class Course(db.Model):
+    __tablename__ = 'courses'
+
+    id = db.Column(db.Integer, primary_key=True)
+    course_code = db.Column(db.String(20), unique=True, nullable=False)
+    title = db.Column(db.String(150), nullable=False)
+    faculty_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True) # Link to faculty user
+    links = db.Column(db.JSON, nullable=False, default=list) # [{'name': 'Notes', 'url': '...'}, ...]
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    faculty = db.relationship('User')
+
+    @property
+    def display_name(self):
+        return f'{self.course_code} - {self.title}'
+
+
+class Enrollment(db.Model):
+    __tablename__ = 'enrollments'
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    enrolled_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'course_id', name='uq_enrollments_student_course'),
+        db.Index('ix_enrollments_course', 'course_id'),
+    )
+
+
+class Contest(db.Model):
+    __tablename__ = 'contests'
+
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(150), nullable=False)
+    starts_at = db.Column(db.DateTime, nullable=True)
+    ends_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+
+class Assignment(db.Model):
+    __tablename__ = 'assignments'
+
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    contest_id = db.Column(db.Integer, db.ForeignKey('contests.id'), nullable=True, index=True) # Set for contest problems
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    due_date = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    course = db.relationship('Course')
+
+    __table_args__ = (
+        db.Index('ix_assignments_course_due', 'course_id', 'due_date'),
+    )
+
+
+class Submission(db.Model):
+    __tablename__ = 'submissions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.id'), nullable=False)
+    content = db.Column(db.Text, nullable=False) # Submitted source code / answer
+    submitted_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+    grade = db.Column(db.String(20), nullable=True) # e.g. 'A' or '85/100'; NULL until graded
+    review = db.Column(db.Text, nullable=True)
+    graded_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'assignment_id', name='uq_submissions_student_assignment'),
+        db.Index('ix_submissions_assignment', 'assignment_id'),
+    )
+
+    @staticmethod
+    def status_for(submission_id, grade):
+        """Dashboard status for a (possibly missing) submission."""
+        if submission_id is None:
+            return 'Pending'
+        return 'Graded' if grade is not None else 'Submitted'
+
+
+class Attendance(db.Model):
+    __tablename__ = 'attendance'
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    is_present = db.Column(db.Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'course_id', 'date', name='uq_attendance_student_course_date'),
+        db.Index('ix_attendance_course_date', 'course_id', 'date'),
+    )
+
+class StudentSummary(db.Model):
+    """Per-student counters behind the dashboard stats, maintained incrementally (see summaries.py)."""
+    __tablename__ = 'student_summaries'
+
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    attendance_present = db.Column(db.Integer, nullable=False, default=0)
+    attendance_total = db.Column(db.Integer, nullable=False, default=0)
+    pending_count = db.Column(db.Integer, nullable=False, default=0) # Assignments of enrolled courses not yet submitted
+    submission_count = db.Column(db.Integer, nullable=False, default=0)
+    graded_count = db.Column(db.Integer, nullable=False, default=0)
+    current_streak = db.Column(db.Integer, nullable=False, default=0) # Consecutive active days (present or submitted)
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+    last_active_date = db.Column(db.Date, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class LeaderboardScore(db.Model):
+    """Persisted score per (board, student); the in-memory boards in leaderboard.py are rebuilt from it."""
+    __tablename__ = 'leaderboard_scores'
+
+    board = db.Column(db.String(40), primary_key=True) # 'global' or 'contest:<id>'
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    score = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_leaderboard_scores_board_updated', 'board', 'updated_at'), # Incremental sync between processes
+    )
+
+class SubmissionSignature(db.Model):
+    """MinHash signature of a submission's normalized code (see similarity.py)."""
+    __tablename__ = 'submission_signatures'
+
+    submission_id = db.Column(db.Integer, db.ForeignKey('submissions.id'), primary_key=True)
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignments.id'), nullable=False)
+    signature = db.Column(db.LargeBinary, nullable=False) # NUM_PERM little-endian uint32 minima
+    token_count = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_submission_signatures_assignment_updated', 'assignment_id', 'updated_at'), # Load and sync per assignment
+    )
+
+# ... etc. for Content, Events, etc.
\ No newline at end of file
@@ -0,0 +1,87 @@
+# backend/passwords.py
+
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask_bcrypt import generate_password_hash, check_password_hash
+
+from config import Config
+from metrics import BCRYPT_SECONDS
+
+# bcrypt is pure CPU. Running it on a small dedicated pool (sized to the cores
+# we want to spend on it) keeps a login storm from oversubscribing the CPU that
+# the I/O-bound request threads also need; the bcrypt C extension releases the
+# GIL, so the pool really runs in parallel.
+_executor = ThreadPoolExecutor(max_workers=Config.BCRYPT_WORKERS, thread_name_prefix='bcrypt')
+
+# Bulk imports hash thousands of passwords; they get their own process pool so an
+# intake never queues in front of interactive logins on the thread pool above.
+_bulk_pool = None
+_bulk_pool_lock = threading.Lock()
+
+
+def hash_password(password, rounds=None):
+    """Hash password with the configured bcrypt cost on the hashing pool."""
+    rounds = rounds or Config.BCRYPT_LOG_ROUNDS
+    started = time.perf_counter()
+    password_hash = _executor.submit(generate_password_hash, password, rounds).result().decode('utf8')
+    BCRYPT_SECONDS.observe(time.perf_counter() - started, 'hash')
+    return password_hash
+
+
+def _hash_one(password, rounds):
+    return generate_password_hash(password, rounds).decode('utf8')
+
+
+def _get_bulk_pool():
+    global _bulk_pool
+    with _bulk_pool_lock:
+        if _bulk_pool is None:
+            # forkserver keeps workers from inheriting the Flask process's threads and sockets
+            _bulk_pool = ProcessPoolExecutor(max_workers=Config.BCRYPT_IMPORT_WORKERS,
+                                             mp_context=multiprocessing.get_context('forkserver'))
+        return _bulk_pool
+
+
+def hash_passwords(passwords, rounds=None):
+    """Hash many passwords across the bulk process pool. Returns hashes in input order."""
+    if not passwords:
+        return []
+    rounds = rounds or Config.BCRYPT_LOG_ROUNDS
+    chunksize = max(1, len(passwords) // (Config.BCRYPT_IMPORT_WORKERS * 4))
+    pool = _get_bulk_pool()
+    started = time.perf_counter()
+    try:
+        hashes = list(pool.map(_hash_one, passwords, [rounds] * len(passwords), chunksize=chunksize))
+        BCRYPT_SECONDS.observe(time.perf_counter() - started, 'bulk_hash')
+        return hashes
+    except BrokenProcessPool:
+        global _bulk_pool
+        with _bulk_pool_lock:
+            if _bulk_pool is pool: # A worker died: start a fresh pool for the next call
+                _bulk_pool = None
+        raise
+
+
+def verify_password(password_hash, password):
+    """Check password against a stored bcrypt hash on the hashing pool."""
+    started = time.perf_counter()
+    matches = _executor.submit(check_password_hash, password_hash, password).result()
+    BCRYPT_SECONDS.observe(time.perf_counter() - started, 'verify')
+    return matches
+
+
+def hash_rounds(password_hash):
+    """Return the cost factor encoded in a bcrypt hash ('$2b$12$...' -> 12), or None."""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(password_hash, rounds=None):
+    """True when the stored hash was made with a different cost than configured."""
+    return hash_rounds(password_hash) != (rounds or Config.BCRYPT_LOG_ROUNDS)
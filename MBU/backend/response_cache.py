@@ -0,0 +1,216 @@
+# backend/response_cache.py
+
+import gzip
+import time
+import hashlib
+import datetime
+import threading
+
+from flask import Response, request, current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from cache import LRUCache
+from database import primary_reads, read_your_writes
+from identity_cache import make_invalidation_backend
+from models import User, Course, Enrollment, Assignment, Submission, Attendance, StudentSummary, LeaderboardScore
+
+try:
+    import brotli # Optional: served only when installed
+except ImportError:
+    brotli = None
+
+# Conditional GET and a bounded cache of serialized dashboard payloads.
+#
+# Every user has a version number, bumped after commit whenever a record their
+# dashboard reads changes (ORM events below; bulk writers call invalidate_users /
+# invalidate_all). A request whose (kind, user, fields) entry is cached at the
+# current version is answered from the cached bytes, or with 304 when
+# If-None-Match matches, without rebuilding. ETags hash the body, so every
+# process produces the same tag for the same payload. Bumps reach other
+# processes through the identity cache's invalidation backend, on their own channel.
+# A rebuild soon after a bump reads from the primary, so a lagging read replica
+# can't get pre-change data cached under the new version.
+
+ADMIN_SCOPE = 0 # Published id meaning "the admin dashboards" (any academic change)
+ALL_SCOPE = -1 # Published id meaning "everything" (rebuilds, bulk imports)
+COMPRESS_MIN_BYTES = 1024
+
+
+class DashboardCache:
+    def __init__(self, maxsize, ttl, backend):
+        self._cache = LRUCache(maxsize, ttl=ttl)
+        self._versions = {} # user id / scope -> version
+        self._bumped_at = {} # user id / scope -> monotonic time of the last bump
+        self._lock = threading.Lock()
+        self.backend = backend
+
+    def _bump(self, scope_ids):
+        now = time.monotonic()
+        with self._lock:
+            for scope in scope_ids:
+                self._versions[scope] = self._versions.get(scope, 0) + 1
+                self._bumped_at[scope] = now
+
+    def invalidate(self, scope_ids):
+        """Bump scopes here and in every process sharing the backend."""
+        scope_ids = set(scope_ids)
+        self._bump(scope_ids)
+        for scope in scope_ids:
+            self.backend.publish(scope)
+
+    def version(self, kind, user_id):
+        self._bump(self.backend.poll())
+        with self._lock:
+            version = (self._versions.get(ALL_SCOPE, 0), self._versions.get(user_id, 0))
+            if kind == 'admin':
+                version += (self._versions.get(ADMIN_SCOPE, 0),)
+        if kind == 'student':
+            version += (datetime.date.today(),) # Streaks lapse with the calendar
+        return version
+
+    def _recently_bumped(self, kind, user_id):
+        scopes = (ALL_SCOPE, user_id, ADMIN_SCOPE) if kind == 'admin' else (ALL_SCOPE, user_id)
+        since = time.monotonic() - read_your_writes.window
+        with self._lock:
+            return any(self._bumped_at.get(scope, float('-inf')) >= since for scope in scopes)
+
+    def _entry(self, kind, user_id, fields, build):
+        key = (kind, user_id, fields)
+        version = self.version(kind, user_id) # Read before building: a concurrent bump makes this entry stale
+        entry = self._cache.get(key)
+        if entry is None or entry['version'] != version:
+            if self._recently_bumped(kind, user_id):
+                with primary_reads():
+                    payload = build()
+            else:
+                payload = build()
+            if fields:
+                payload = {name: payload[name] for name in fields if name in payload}
+            body = current_app.json.dumps(payload).encode('utf-8')
+            entry = {'version': version, 'etag': hashlib.blake2b(body, digest_size=16).hexdigest(),
+                     'body': body, 'encoded': {}}
+            self._cache.set(key, entry)
+        return entry
+
+    def serve(self, kind, user_id, build):
+        """Response for a dashboard, built with build() only when the cached bytes are stale."""
+        fields = tuple(sorted({name.strip() for name in (request.args.get('fields') or '').split(',') if name.strip()}))
+        entry = self._entry(kind, user_id, fields, build)
+
+        if request.if_none_match.contains(entry['etag']):
+            response = Response(status=304)
+        else:
+            encoding = _pick_encoding(len(entry['body']))
+            if encoding:
+                if encoding not in entry['encoded']: # Benign race: two threads may compress the same body once each
+                    entry['encoded'][encoding] = _compress(encoding, entry['body'])
+                response = Response(entry['encoded'][encoding], mimetype='application/json')
+                response.headers['Content-Encoding'] = encoding
+            else:
+                response = Response(entry['body'], mimetype='application/json')
+        response.set_etag(entry['etag'])
+        response.headers['Cache-Control'] = 'private, no-cache' # Always revalidate; 304s are cheap
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def stats(self):
+        return self._cache.stats()
+
+
+def _pick_encoding(size):
+    if size < COMPRESS_MIN_BYTES:
+        return None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(encoding, body):
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+dashboard_cache = None
+
+
+def init_dashboard_cache(app):
+    """Create the process-wide dashboard cache from app config."""
+    global dashboard_cache
+    backend = make_invalidation_backend(app.config['IDENTITY_CACHE_BACKEND'], app.config['IDENTITY_CACHE_POLL_INTERVAL'],
+                                        channel='dashboard_invalidations')
+    dashboard_cache = DashboardCache(app.config['DASHBOARD_CACHE_SIZE'], app.config['DASHBOARD_CACHE_TTL'], backend)
+    return dashboard_cache
+
+
+def invalidate_users(user_ids):
+    """Bump the given users' dashboards (and the admin dashboard) now. For writes that bypass the ORM."""
+    if dashboard_cache is not None:
+        dashboard_cache.invalidate(set(user_ids) | {ADMIN_SCOPE})
+
+
+def invalidate_all():
+    if dashboard_cache is not None:
+        dashboard_cache.invalidate([ALL_SCOPE])
+
+
+# --- Change Tracking --- #
+# Affected users are collected on the session during flush and bumped after
+# commit, so a rebuild racing the transaction can't cache pre-commit data under
+# the new version. Rolled-back changes are dropped.
+
+def _collect(target, user_ids):
+    session = object_session(target)
+    if session is None or dashboard_cache is None:
+        return
+    session.info.setdefault('dashboard_changes', set()).update(user_ids)
+
+
+def _enrolled(connection, course_id):
+    return connection.execute(select(Enrollment.student_id).where(Enrollment.course_id == course_id)).scalars().all()
+
+
+def _on_student_record(mapper, connection, target):
+    _collect(target, {target.student_id, ADMIN_SCOPE})
+
+
+def _on_assignment(mapper, connection, target):
+    _collect(target, set(_enrolled(connection, target.course_id)) | {ADMIN_SCOPE})
+
+
+def _on_course(mapper, connection, target):
+    _collect(target, set(_enrolled(connection, target.id)) | {target.faculty_id, ADMIN_SCOPE})
+
+
+def _on_user(mapper, connection, target):
+    _collect(target, {target.id, ADMIN_SCOPE})
+
+
+def _on_admin_record(mapper, connection, target):
+    _collect(target, {ADMIN_SCOPE})
+
+
+for _model, _handler in ((Attendance, _on_student_record), (Submission, _on_student_record),
+                         (Enrollment, _on_student_record), (StudentSummary, _on_student_record),
+                         (Assignment, _on_assignment), (Course, _on_course), (User, _on_user),
+                         (LeaderboardScore, _on_admin_record)):
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, _handler)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed(session):
+    changes = session.info.pop('dashboard_changes', None)
+    if changes and dashboard_cache is not None:
+        changes.discard(None)
+        dashboard_cache.invalidate(changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_rolled_back(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop('dashboard_changes', None)
@@ -1,63 +1,917 @@
 # backend/sandbox_executor.py
 
+import os
+import sys
+import json
 import time
-import random
+import codecs
+import fnmatch
+import hashlib
+import functools
+import shutil
+import select
+import signal
+import resource
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import Config
+from cache import LRUCache
+from artifact_cache import ArtifactCache
 
 # --- IMPORTANT --- #
-# This is a PLACEHOLDER module. Direct code execution is UNSAFE.
-# You MUST replace these functions with calls to a secure sandbox environment
-# like Docker containers or a code execution API (e.g., Judge0).
+# This module runs untrusted code as local processes restricted by rlimits
+# (CPU time, wall clock, address space, file size and captured output).
+# rlimits bound resource usage; they do NOT isolate the filesystem or network.
+# Run the backend as an unprivileged user (ideally inside a container) in production.
 # ----------------- #
 
-def execute_code_securely(language: str, code: str, input_data: str):
-    """Placeholder for secure code execution.
+# --- Language Toolchains --- #
+# 'compile' and 'run' are argv templates expanded inside the per-run working directory.
+# 'artifacts' are the glob patterns of compiler output kept in the artifact cache.
+# 'limit_address_space' is off for runtimes (V8, JVM) that reserve far more virtual
+# memory than they use; their heap is capped with a runtime flag instead.
+LANGUAGES = {
+    'python': {
+        'source': 'main.py',
+        'compile': None,
+        'run': [sys.executable, '-I', 'main.py'],
+        'limit_address_space': True,
+    },
+    'javascript': {
+        'source': 'main.js',
+        'compile': None,
+        'run': ['node', '--max-old-space-size={memory_mb}', 'main.js'],
+        'limit_address_space': False,
+    },
+    'c': {
+        'source': 'main.c',
+        'compile': ['gcc', '-O2', '-std=c11', '-o', 'main', 'main.c', '-lm'],
+        'artifacts': ['main'],
+        'run': ['./main'],
+        'limit_address_space': True,
+    },
+    'c_cpp': {
+        'source': 'main.cpp',
+        'compile': ['g++', '-O2', '-std=c++17', '-o', 'main', 'main.cpp'],
+        'artifacts': ['main'],
+        'run': ['./main'],
+        'limit_address_space': True,
+    },
+    'java': {
+        'source': 'Main.java',
+        'compile': ['javac', '-J-Xmx{memory_mb}m', 'Main.java'],
+        'artifacts': ['*.class'],
+        'run': ['java', '-Xmx{memory_mb}m', '-Xss64m', '-cp', '.', 'Main'],
+        'limit_address_space': False,
+    },
+}
+LANGUAGES['cpp'] = LANGUAGES['c_cpp'] # Alias used by some clients
+
+
+def default_limits():
+    """Return the sandbox limits configured in Config as a plain dict."""
+    return {
+        'cpu_time': Config.SANDBOX_CPU_TIME_LIMIT,
+        'wall_time': Config.SANDBOX_WALL_TIME_LIMIT,
+        'memory_mb': Config.SANDBOX_MEMORY_LIMIT_MB,
+        'output_bytes': Config.SANDBOX_OUTPUT_LIMIT_BYTES,
+        'compile_time': Config.SANDBOX_COMPILE_TIME_LIMIT,
+        'stream_bytes': Config.SANDBOX_STREAM_LIMIT_BYTES,
+    }
+
+
+def _result(success=True, stdout='', stderr='', error_type=None, execution_time=None, memory=None, exit_code=None, warm=False):
+    return {
+        'success': success,
+        'stdout': stdout,
+        'stderr': stderr,
+        'error_type': error_type,
+        'execution_time': execution_time,
+        'memory': memory,
+        'exit_code': exit_code,
+        'warm': warm,
+    }
+
+
+# --- Process Runner (executes inside a pool worker) --- #
+
+def _set_child_limits(cpu_time, memory_mb, output_bytes, limit_address_space):
+    """Build the preexec_fn applied in the child between fork and exec."""
+    def apply_limits():
+        cpu = max(1, int(cpu_time + 0.999))
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (output_bytes, output_bytes))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        if limit_address_space:
+            address_space = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (address_space, address_space))
+    return apply_limits
+
+
+def _kill_group(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+MEMORY_SAMPLE_INTERVAL = 0.05 # Seconds between peak-memory samples of a running program (also the stream flush cadence)
+
+
+def _status_kb(pid, field):
+    """A memory field (KB) of /proc/<pid>/status, or 0 once the process is gone (or off Linux)."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def _spawn(argv, cwd, cpu_time, memory_mb, output_bytes, limit_address_space, pass_fds=()):
+    """Start argv in its own session under rlimits with piped stdio.
+
+    The returned Popen carries fork_rss: the worker's resident size (KB) when it forked.
+    """
+    env = {
+        'PATH': os.environ.get('PATH', '/usr/bin:/bin'),
+        'HOME': cwd,
+        'LANG': 'C.UTF-8',
+        'PYTHONDONTWRITEBYTECODE': '1',
+    }
+    fork_rss = _status_kb('self', 'VmRSS')
+    proc = subprocess.Popen(
+        argv,
+        cwd=cwd,
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        pass_fds=pass_fds,
+        start_new_session=True, # Own process group so timeouts kill any children too
+        preexec_fn=_set_child_limits(cpu_time, memory_mb, output_bytes, limit_address_space),
+    )
+    proc.fork_rss = fork_rss
+    return proc
+
+
+class OutputBuffer:
+    """Byte-bounded capture buffer.
+
+    Keeps the first half of the limit verbatim and a ring of the most recent
+    bytes for the second half; anything in between is replaced by a truncation
+    marker when the buffer is rendered.
+    """
+
+    def __init__(self, limit):
+        self.head_limit = limit // 2
+        self.tail_limit = limit - self.head_limit
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, chunk):
+        self.total += len(chunk)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head.extend(chunk[:room])
+            chunk = chunk[room:]
+        if chunk:
+            self.tail.extend(chunk)
+            if len(self.tail) > self.tail_limit:
+                del self.tail[:len(self.tail) - self.tail_limit]
+
+    def getvalue(self):
+        dropped = self.total - len(self.head) - len(self.tail)
+        text = self.head.decode('utf-8', errors='replace')
+        if dropped:
+            text += f'\n[... {dropped} bytes truncated ...]\n'
+        return text + self.tail.decode('utf-8', errors='replace')
+
+
+class _StreamForwarder:
+    """Coalesces output chunks from the reader threads and forwards them to a queue.
+
+    Chunks are flushed by the supervisor every STREAM_FLUSH_INTERVAL seconds, or
+    sooner once STREAM_FLUSH_BYTES are pending, as ('stdout'|'stderr', text) tuples.
+    """
+
+    STREAM_FLUSH_INTERVAL = 0.05
+    STREAM_FLUSH_BYTES = 16 * 1024
+
+    def __init__(self, events):
+        self.events = events
+        self.lock = threading.Lock()
+        self.pending = {'stdout': bytearray(), 'stderr': bytearray()}
+        self.decoders = {name: codecs.getincrementaldecoder('utf-8')(errors='replace') for name in self.pending}
+
+    def feed(self, name, chunk):
+        with self.lock:
+            self.pending[name].extend(chunk)
+            full = len(self.pending[name]) >= self.STREAM_FLUSH_BYTES
+        if full:
+            self.flush()
+
+    def flush(self, final=False):
+        with self.lock:
+            batches = [(name, self.decoders[name].decode(bytes(buf), final=final)) for name, buf in self.pending.items()]
+            for buf in self.pending.values():
+                buf.clear()
+        for name, text in batches:
+            if text:
+                self.events.put((name, text))
+
+
+def _run_process(argv, cwd, input_data, cpu_time, wall_time, memory_mb, output_bytes, limit_address_space):
+    """Run argv under rlimits, capping captured output at output_bytes per stream.
+
+    Returns a dict with exit_code, stdout, stderr, timed_out, output_exceeded,
+    wall_time (seconds), cpu_time (seconds) and peak memory (KB).
+    """
+    proc = _spawn(argv, cwd, cpu_time, memory_mb, output_bytes, limit_address_space)
+    return _supervise(proc, input_data, cpu_time, wall_time, output_bytes)
+
+
+def _supervise(proc, input_data, cpu_time, wall_time, output_bytes, max_output=None, forwarder=None, cancel=None):
+    """Feed stdin, capture output and enforce the wall clock for a started process.
+
+    Captured output is bounded by OutputBuffer(output_bytes). The process is killed
+    once a stream has produced more than max_output bytes (default output_bytes),
+    or when cancel (an Event-like object) is set. With a forwarder, output is also
+    streamed out as it is produced.
+    """
+    max_output = max_output or output_bytes
+    started = time.monotonic()
+    state = {'timed_out': False, 'output_exceeded': False, 'cancelled': False, 'peak_rss': 0}
+    captured = {'stdout': OutputBuffer(output_bytes), 'stderr': OutputBuffer(output_bytes)}
+    finished = threading.Event()
+
+    def read_stream(stream, name):
+        buf = captured[name]
+        while True:
+            chunk = stream.read1(65536)
+            if not chunk:
+                break
+            room = max_output - buf.total
+            if room < len(chunk):
+                state['output_exceeded'] = True
+                _kill_group(proc)
+                chunk = chunk[:max(room, 0)]
+            buf.write(chunk)
+            if forwarder and chunk:
+                forwarder.feed(name, chunk)
+        stream.close()
+
+    def write_stdin():
+        try:
+            if input_data:
+                proc.stdin.write(input_data.encode('utf-8'))
+            proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    def watchdog():
+        # Enforces the wall clock, polls for cancellation, samples peak memory and flushes streamed output.
+        deadline = started + wall_time
+        while True:
+            state['peak_rss'] = max(state['peak_rss'], _status_kb(proc.pid, 'VmHWM'))
+            if finished.wait(min(MEMORY_SAMPLE_INTERVAL, max(0, deadline - time.monotonic()))):
+                return
+            if forwarder:
+                forwarder.flush()
+            if cancel is not None and cancel.is_set():
+                state['cancelled'] = True
+                _kill_group(proc)
+                return
+            if time.monotonic() >= deadline:
+                state['timed_out'] = True
+                _kill_group(proc)
+                return
+
+    threads = [
+        threading.Thread(target=read_stream, args=(proc.stdout, 'stdout'), daemon=True),
+        threading.Thread(target=read_stream, args=(proc.stderr, 'stderr'), daemon=True),
+        threading.Thread(target=write_stdin, daemon=True),
+    ]
+    for t in threads:
+        t.start()
+    monitor = threading.Thread(target=watchdog, daemon=True)
+    monitor.start()
+
+    # Wait for the exit without reaping: while the exited leader is unreaped its
+    # pid (and so the process group id) can't be reused, so killing the group is safe.
+    os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+    elapsed = time.monotonic() - started
+    finished.set()
+    monitor.join(timeout=1.0)
+    _kill_group(proc) # Anything the program left behind in its group
+    for t in threads:
+        t.join(timeout=1.0)
+    # wait4 (instead of Popen.wait) gives us the child's own rusage for peak memory.
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if forwarder:
+        forwarder.flush(final=True)
+
+    # ru_maxrss also counts the pages the child inherited from this worker before exec,
+    # which stay below the worker's own RSS; only a larger value is the program's own peak.
+    fork_rss = getattr(proc, 'fork_rss', 0)
+    peak_rss = usage.ru_maxrss if usage.ru_maxrss > fork_rss else state['peak_rss']
+
+    killed_by = -proc.returncode if proc.returncode < 0 else None
+    if killed_by == signal.SIGXCPU or (killed_by == signal.SIGKILL and usage.ru_utime + usage.ru_stime >= cpu_time):
+        state['timed_out'] = True
+
+    return {
+        'exit_code': proc.returncode,
+        'stdout': captured['stdout'].getvalue(),
+        'stderr': captured['stderr'].getvalue(),
+        'timed_out': state['timed_out'],
+        'output_exceeded': state['output_exceeded'],
+        'cancelled': state['cancelled'],
+        'wall_time': elapsed,
+        'cpu_time': usage.ru_utime + usage.ru_stime,
+        'memory': peak_rss, # KB
+    }
+
+
+def _expand(argv, limits):
+    return [arg.replace('{memory_mb}', str(limits['memory_mb'])) for arg in argv]
+
+
+# --- Compiled Artifact Cache --- #
+
+_artifact_cache = None
+
+
+def _get_artifact_cache():
+    """Per-process handle on the shared on-disk artifact store (None when disabled)."""
+    global _artifact_cache
+    if _artifact_cache is None and Config.ARTIFACT_CACHE_MAX_MB > 0:
+        _artifact_cache = ArtifactCache(Config.ARTIFACT_CACHE_DIR, Config.ARTIFACT_CACHE_MAX_MB * 1024 * 1024)
+    return _artifact_cache
+
+
+@functools.lru_cache(maxsize=None)
+def _toolchain_version(compiler):
+    """First line of the compiler's version banner, so upgrades never reuse stale binaries."""
+    try:
+        out = subprocess.run([compiler, '-version' if compiler == 'javac' else '--version'],
+                             capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return 'unknown'
+    banner = (out.stdout or out.stderr).strip()
+    return banner.splitlines()[0] if banner else 'unknown'
+
+
+def _artifact_key(compile_argv, code):
+    payload = json.dumps([_toolchain_version(compile_argv[0]), compile_argv, code])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _artifact_names(spec, workdir):
+    names = os.listdir(workdir)
+    return [name for name in names if any(fnmatch.fnmatch(name, pattern) for pattern in spec['artifacts'])]
+
+
+def artifact_stats():
+    """Return occupancy of the on-disk compiled artifact cache."""
+    cache = _get_artifact_cache()
+    return cache.stats() if cache else {'entries': 0, 'bytes': 0, 'max_bytes': 0}
+
+
+def _compile(spec, workdir, code, limits):
+    """Compile the source in workdir, reusing cached artifacts when possible.
+
+    Returns None on success or an error result dict.
+    """
+    argv = _expand(spec['compile'], limits)
+    cache = _get_artifact_cache()
+    key = _artifact_key(argv, code) if cache else None
+    if cache and cache.get(key, workdir):
+        return None
+
+    try:
+        run = _run_process(
+            argv, workdir, '',
+            cpu_time=limits['compile_time'], wall_time=limits['compile_time'] * 2,
+            memory_mb=max(limits['memory_mb'], 1024), output_bytes=limits['output_bytes'],
+            limit_address_space=False,
+        )
+    except FileNotFoundError as e:
+        return _result(success=False, stderr=f'Compiler not available on server: {e.filename}', error_type='sandbox')
+    if run['timed_out']:
+        return _result(stderr='Compilation timed out.', error_type='compile', execution_time=round(run['wall_time'], 4))
+    if run['exit_code'] != 0:
+        return _result(stdout=run['stdout'], stderr=run['stderr'], error_type='compile',
+                       execution_time=round(run['wall_time'], 4), exit_code=run['exit_code'])
+    if cache:
+        cache.put(key, workdir, _artifact_names(spec, workdir))
+    return None
+
+
+# --- Warm Interpreters --- #
+# Interpreted languages spend tens to hundreds of milliseconds starting up before
+# the first user line runs. Each pool worker keeps a few interpreters already
+# started under the run's rlimits, each in its own scratch directory, parked on
+# a control pipe. A run copies its source next to an idle one and releases it.
+# Warm interpreters go on to execute untrusted code, so they are single-use: one
+# is recycled after every run (and immediately if it shows any sign of life
+# before hand-off), and a replacement is started while the worker is idle.
+# Interpreters are only kept for default_limits(); runs with limit overrides
+# start cold, so a worker never holds more than SANDBOX_WARM_PER_LANGUAGE each.
+
+_PYTHON_BOOTSTRAP = (
+    "import os, sys, traceback\n"
+    "ctrl = int(sys.argv[1])\n"
+    "if not os.read(ctrl, 1): sys.exit(0)\n"
+    "os.close(ctrl)\n"
+    "sys.argv = ['main.py']\n"
+    "with open('main.py', encoding='utf-8') as f: source = f.read()\n"
+    "try:\n"
+    "    exec(compile(source, 'main.py', 'exec'), {'__name__': '__main__', '__file__': 'main.py', '__builtins__': __builtins__})\n"
+    "except SystemExit:\n"
+    "    raise\n"
+    "except BaseException as e:\n"
+    "    traceback.print_exception(type(e), e, e.__traceback__.tb_next)\n"
+    "    sys.exit(1)\n"
+)
+
+_NODE_BOOTSTRAP = (
+    "const fs = require('fs'); const ctrl = Number(process.argv[1]);"
+    "if (fs.readSync(ctrl, Buffer.alloc(1), 0, 1, null) === 0) process.exit(0);"
+    "fs.closeSync(ctrl); process.argv = [process.argv[0], require('path').resolve('main.js')];"
+    "require('module').runMain();" # Runs main.js as the main module, so require.main === module as in a cold run
+)
+
+LANGUAGES['python']['warm_run'] = [sys.executable, '-I', '-c', _PYTHON_BOOTSTRAP]
+LANGUAGES['javascript']['warm_run'] = ['node', '--max-old-space-size={memory_mb}', '-e', _NODE_BOOTSTRAP]
+
+_warm = {} # language -> [idle interpreter started under default_limits(), ...]
+
+
+def _warm_limits(limits):
+    return (limits['cpu_time'], limits['memory_mb'], limits['output_bytes'])
+
+
+def _start_warm(language, limits):
+    spec = LANGUAGES[language]
+    workdir = tempfile.mkdtemp(prefix='campus-bridge-warm-')
+    ctrl_r, ctrl_w = os.pipe()
+    try:
+        proc = _spawn(_expand(spec['warm_run'], limits) + [str(ctrl_r)], workdir, limits['cpu_time'],
+                      limits['memory_mb'], limits['output_bytes'], spec['limit_address_space'], pass_fds=(ctrl_r,))
+    except OSError:
+        os.close(ctrl_w)
+        shutil.rmtree(workdir, ignore_errors=True)
+        return None
+    finally:
+        os.close(ctrl_r)
+    return {'proc': proc, 'ctrl_w': ctrl_w, 'workdir': workdir}
+
+
+def _discard_warm(warm):
+    _kill_group(warm['proc'])
+    warm['proc'].wait()
+    for stream in (warm['proc'].stdin, warm['proc'].stdout, warm['proc'].stderr):
+        stream.close()
+    try:
+        os.close(warm['ctrl_w'])
+    except OSError:
+        pass
+    shutil.rmtree(warm['workdir'], ignore_errors=True)
+
+
+def _take_warm(language, limits):
+    """Pop an idle, untouched interpreter for these limits, or None."""
+    if _warm_limits(limits) != _warm_limits(default_limits()):
+        return None
+    idle = _warm.get(language, [])
+    while idle:
+        warm = idle.pop()
+        readable, _, _ = select.select([warm['proc'].stdout, warm['proc'].stderr], [], [], 0)
+        if warm['proc'].poll() is None and not readable:
+            return warm
+        _discard_warm(warm) # Exited or wrote something before hand-off
+    return None
+
+
+def _refill_warm(language):
+    """Top up the idle interpreters of language (started under default_limits())."""
+    if 'warm_run' not in LANGUAGES[language]:
+        return
+    limits = default_limits()
+    idle = _warm.setdefault(language, [])
+    while len(idle) < Config.SANDBOX_WARM_PER_LANGUAGE:
+        warm = _start_warm(language, limits)
+        if warm is None:
+            break
+        idle.append(warm)
+
+
+def _discard_all_warm():
+    for idle in _warm.values():
+        while idle:
+            _discard_warm(idle.pop())
+
+
+def _init_worker():
+    """Pool worker initializer: pre-start interpreters for the default limits."""
+    multiprocessing.util.Finalize(None, _discard_all_warm, exitpriority=10)
+    for language in LANGUAGES:
+        _refill_warm(language)
+
+
+# Under RLIMIT_AS an allocation fails long before resident memory nears the
+# limit, so the verdict comes from how the program failed, not from its RSS.
+_OUT_OF_MEMORY_MARKERS = (
+    'MemoryError', # Python
+    'std::bad_alloc', # C++
+    'Cannot allocate memory', # ENOMEM from the C library
+    'java.lang.OutOfMemoryError',
+    'JavaScript heap out of memory', # Node (--max-old-space-size)
+    'Could not reserve enough space', # JVM unable to reserve its heap
+)
+
+
+def _hit_memory_limit(run, limits):
+    """Whether a failed run ran out of memory under its limit."""
+    if any(marker in run['stderr'] for marker in _OUT_OF_MEMORY_MARKERS):
+        return True
+    # A NULL malloc dereferenced in C dies with SIGSEGV, after touching most of the limit
+    killed_by = -run['exit_code'] if run['exit_code'] < 0 else None
+    if killed_by in (signal.SIGSEGV, signal.SIGKILL) and run['memory'] >= limits['memory_mb'] * 1024 * 0.8:
+        return True
+    return run['memory'] >= limits['memory_mb'] * 1024 * 0.9
+
+
+def _run_program(language, workdir, input_data, limits, forwarder=None, cancel=None):
+    """Run the prepared program in workdir once and map the outcome to a result dict.
+
+    With a forwarder the run is streamed: output may total limits['stream_bytes']
+    while the captured copy stays bounded by limits['output_bytes'].
+    """
+    spec = LANGUAGES[language]
+    warm = _take_warm(language, limits) if 'warm_run' in spec else None
+    max_output = limits['stream_bytes'] if forwarder else limits['output_bytes']
+    try:
+        if warm:
+            shutil.copy2(os.path.join(workdir, spec['source']), os.path.join(warm['workdir'], spec['source']))
+            os.write(warm['ctrl_w'], b'1')
+            os.close(warm['ctrl_w'])
+            proc = warm['proc']
+        else:
+            proc = _spawn(_expand(spec['run'], limits), workdir, limits['cpu_time'], limits['memory_mb'],
+                          limits['output_bytes'], spec['limit_address_space'])
+        run = _supervise(proc, input_data, limits['cpu_time'], limits['wall_time'], limits['output_bytes'],
+                         max_output=max_output, forwarder=forwarder, cancel=cancel)
+    except FileNotFoundError as e:
+        return _result(success=False, stderr=f'Runtime not available on server: {e.filename}', error_type='sandbox')
+    finally:
+        if warm:
+            shutil.rmtree(warm['workdir'], ignore_errors=True)
+        _refill_warm(language)
+
+    stderr = run['stderr']
+    error_type = None
+    if run['cancelled']:
+        error_type = 'cancelled'
+        stderr += "\nExecution Cancelled: The client disconnected."
+    elif run['timed_out']:
+        error_type = 'timeout'
+        stderr += f"\nExecution Timeout: Process exceeded the time limit ({limits['cpu_time']}s CPU / {limits['wall_time']}s wall)."
+    elif run['output_exceeded']:
+        error_type = 'output_limit'
+        stderr += f"\nOutput Limit Exceeded: Output truncated at {max_output} bytes."
+    elif run['exit_code'] != 0:
+        error_type = 'runtime'
+        if _hit_memory_limit(run, limits):
+            error_type = 'memory'
+            stderr += f"\nMemory Limit Exceeded: Process exceeded {limits['memory_mb']} MB."
+
+    return _result(
+        stdout=run['stdout'],
+        stderr=stderr.lstrip('\n'),
+        error_type=error_type,
+        execution_time=round(run['wall_time'], 4),
+        memory=run['memory'],
+        exit_code=run['exit_code'],
+        warm=warm is not None,
+    )
+
+
+def _prepare_in_worker(language, code, limits):
+    """Write (and compile) the program into a fresh scratch directory.
+
+    Returns (workdir, None) on success or (None, error_result) on failure.
+    """
+    spec = LANGUAGES[language]
+    workdir = tempfile.mkdtemp(prefix='campus-bridge-run-')
+    with open(os.path.join(workdir, spec['source']), 'w', encoding='utf-8') as f:
+        f.write(code)
+    if spec['compile']:
+        error = _compile(spec, workdir, code, limits)
+        if error:
+            shutil.rmtree(workdir, ignore_errors=True)
+            return None, error
+    return workdir, None
+
+
+def _run_case_in_worker(language, workdir, input_data, limits):
+    """Run an already prepared program against one input."""
+    return _run_program(language, workdir, input_data, limits)
+
+
+def _execute_in_worker(language, code, input_data, limits, events=None, cancel=None):
+    """Entry point executed inside a pool worker process.
+
+    events/cancel are optional manager proxies used by stream_code_execution.
+    """
+    workdir, error = _prepare_in_worker(language, code, limits)
+    if error:
+        return error
+    forwarder = _StreamForwarder(events) if events is not None else None
+    try:
+        return _run_program(language, workdir, input_data, limits, forwarder=forwarder, cancel=cancel)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# --- Result Cache --- #
+# Identical (language, code, input, limits) runs are served from memory. Only
+# outcomes that are a pure function of those inputs are cached: timeouts, memory
+# and output-limit kills, and sandbox failures depend on machine load and are
+# always re-run.
+
+CACHEABLE_ERROR_TYPES = (None, 'compile', 'runtime')
+
+result_cache = LRUCache(Config.EXECUTION_CACHE_SIZE, ttl=Config.EXECUTION_CACHE_TTL)
+
+
+def _cache_key(language, code, input_data, limits):
+    # stream_bytes only affects streamed runs, which read the cache but never fill it
+    limits = {name: value for name, value in limits.items() if name != 'stream_bytes'}
+    payload = json.dumps([language, code, input_data, limits], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def cache_stats():
+    """Return hit/miss counters and occupancy of the execution result cache."""
+    return result_cache.stats()
+
+
+_run_counts = {'warm': 0, 'cold': 0}
+_run_counts_lock = threading.Lock()
+
+
+def _count_run(result):
+    if result.get('execution_time') is None:
+        return # Never reached the run step (compile error, sandbox failure)
+    with _run_counts_lock:
+        _run_counts['warm' if result.get('warm') else 'cold'] += 1
+
+
+def warm_stats():
+    """Return how many program runs were served by a warm interpreter vs. a cold start."""
+    with _run_counts_lock:
+        return dict(_run_counts, warm_per_language=Config.SANDBOX_WARM_PER_LANGUAGE)
+
+
+# --- Worker Pool --- #
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # forkserver keeps workers from inheriting the Flask process's threads and sockets
+            _pool = ProcessPoolExecutor(
+                max_workers=Config.SANDBOX_POOL_SIZE,
+                mp_context=multiprocessing.get_context('forkserver'),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def _reset_pool(broken):
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pool():
+    """Stop the worker pool (used on app shutdown and in scripts)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _submit(fn, *args):
+    """Run fn(*args) on the pool and wait for it. Returns None if the pool broke."""
+    pool = _get_pool()
+    try:
+        return pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        print("Sandbox worker pool broke; restarting it.")
+        _reset_pool(pool)
+        return None
+
+
+def execute_code_securely(language: str, code: str, input_data: str, limits: dict = None):
+    """Run code in the local sandbox pool and wait for the result.
 
     Args:
-        language: The programming language (e.g., 'python', 'javascript').
+        language: The programming language (e.g., 'python', 'javascript', 'c', 'c_cpp', 'java').
         code: The source code to execute.
         input_data: Standard input for the code.
+        limits: Optional overrides for the keys returned by default_limits().
 
     Returns:
         A dictionary containing: {
             'success': bool,       # True if execution finished (even with errors), False if sandbox failed
             'stdout': str,       # Captured standard output
             'stderr': str,       # Captured standard error (compilation or runtime)
-            'error_type': str|None, # Type of error ('compile', 'runtime', 'timeout', etc.) - Optional
-            'execution_time': float|None # Execution time in seconds - Optional
+            'error_type': str|None, # 'compile', 'runtime', 'timeout', 'memory', 'output_limit', 'cancelled' or 'sandbox'
+            'execution_time': float|None, # Measured wall-clock run time in seconds
+            'memory': int|None,  # Peak resident memory in KB
+            'exit_code': int|None, # Process exit code (negative for signals)
+            'cached': bool       # True if served from the result cache
         }
     """
-    print(f"--- SANDBOX PLACEHOLDER: Executing {language} --- START ---")
-    print(f"Code:\n{code}")
-    print(f"Input: {input_data}")
+    if language not in LANGUAGES:
+        return _result(success=False, stderr=f'Unsupported language: {language}', error_type='sandbox')
 
-    # Simulate execution delay
-    time.sleep(random.uniform(0.5, 2.0))
+    run_limits = default_limits()
+    if limits:
+        run_limits.update(limits)
 
-    # --- Simulate Output/Error based on code content (VERY basic) --- #
-    stdout = ""
-    stderr = ""
-    success = True
-    error_type = None
+    input_data = input_data or ''
+    key = _cache_key(language, code, input_data, run_limits)
+    cached = result_cache.get(key)
+    if cached is not None:
+        return dict(cached, cached=True)
 
-    if "error" in code.lower(): # Simulate runtime error
-        stderr = f"Traceback (most recent call last):\n  File \"<stdin>\", line {random.randint(1,5)}\nSimulatedRuntimeError: Something went wrong (placeholder)!"
-        error_type = 'runtime'
-    elif "compile" in code.lower(): # Simulate compile error
-        stderr = f"Compilation Error: Invalid syntax near token 'compile_error' on line {random.randint(1,3)} (placeholder)."
-        error_type = 'compile'
-    elif "timeout" in code.lower(): # Simulate timeout
-         stderr = "Execution Timeout: Process exceeded allowed time limit (placeholder)."
-         error_type = 'timeout'
-    else: # Simulate successful execution
-        stdout = f"Hello from {language}!\nProcessed input: {input_data or '[No Input]'}\nSimulated output line 1.\nSimulated output line 2."
-
-    print(f"--- SANDBOX PLACEHOLDER: Execution Result --- > Success: {success}, Stdout: {len(stdout)} chars, Stderr: {len(stderr)} chars, Type: {error_type}")
-    print(f"--- SANDBOX PLACEHOLDER: Executing {language} --- END ---")
+    result = _submit(_execute_in_worker, language, code, input_data, run_limits)
+    if result is None:
+        return _result(success=False, stderr='Sandbox worker crashed. Please try again.', error_type='sandbox')
 
-    return {
-        'success': success, # This 'success' might mean the sandbox ran, not the code itself
-        'stdout': stdout,
-        'stderr': stderr,
-        'error_type': error_type,
-        'execution_time': random.uniform(0.1, 0.5) # Simulated time
-    } 
\ No newline at end of file
+    if result['error_type'] != 'compile':
+        _count_run(result)
+    if result['success'] and result['error_type'] in CACHEABLE_ERROR_TYPES:
+        result_cache.set(key, result)
+    return dict(result, cached=False)
+
+
+# --- Streaming Execution --- #
+# Streamed runs forward output through a multiprocessing manager queue while the
+# program is still running. The caller owns the queue and a cancel event (see
+# open_execution_stream); setting the event kills the sandbox process.
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def open_execution_stream():
+    """Return (events, cancel): a cross-process queue and event for stream_code_execution."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = multiprocessing.get_context('forkserver').Manager()
+        return _manager.Queue(), _manager.Event()
+
+
+def stream_code_execution(language: str, code: str, input_data: str, events, cancel, limits: dict = None):
+    """Run code like execute_code_securely, publishing output to events as it is produced.
+
+    Puts ('stdout', text) and ('stderr', text) tuples while the program runs and a
+    final ('result', result_dict) tuple; the result is also returned. Setting
+    cancel before or during the run stops it with error_type 'cancelled'.
+    """
+    run_limits = default_limits()
+    if limits:
+        run_limits.update(limits)
+    input_data = input_data or ''
+
+    if language not in LANGUAGES:
+        result = _result(success=False, stderr=f'Unsupported language: {language}', error_type='sandbox')
+    elif cancel.is_set(): # Client left while the job was still queued
+        result = _result(stderr='Execution Cancelled: The client disconnected.', error_type='cancelled')
+    else:
+        key = _cache_key(language, code, input_data, run_limits)
+        cached = result_cache.get(key)
+        if cached is not None:
+            for name in ('stdout', 'stderr'):
+                if cached[name]:
+                    events.put((name, cached[name]))
+            result = dict(cached, cached=True)
+        else:
+            result = _submit(_execute_in_worker, language, code, input_data, run_limits, events, cancel)
+            if result is None:
+                result = _result(success=False, stderr='Sandbox worker crashed. Please try again.', error_type='sandbox')
+            if result['error_type'] != 'compile':
+                _count_run(result)
+            result = dict(result, cached=False)
+    events.put(('result', result))
+    return result
+
+
+# --- Batch Execution (one submission, many test cases) --- #
+
+VERDICTS = {'timeout': 'TLE', 'memory': 'MLE', 'output_limit': 'OLE', 'runtime': 'RE', 'compile': 'CE'}
+
+
+def _outputs_match(actual, expected):
+    """Compare outputs ignoring trailing whitespace on each line and trailing blank lines."""
+    def normalize(text):
+        return [line.rstrip() for line in text.rstrip().splitlines()]
+    return normalize(actual) == normalize(expected)
+
+
+def _verdict(result, expected_output):
+    if not result['success']:
+        return 'SE' # Sandbox error
+    if result['error_type']:
+        return VERDICTS.get(result['error_type'], 'RE')
+    if expected_output is not None and not _outputs_match(result['stdout'], expected_output):
+        return 'fail'
+    return 'pass'
+
+
+def execute_batch(language: str, code: str, cases: list, limits: dict = None, stop_on_failure: bool = False):
+    """Compile/load a submission once and run it against each test case, yielding verdicts as they finish.
+
+    Args:
+        language: The programming language (see LANGUAGES).
+        code: The source code to execute.
+        cases: List of {'input': str, 'expected_output': str|None} dicts.
+        limits: Optional overrides for the keys returned by default_limits().
+        stop_on_failure: Stop after the first case whose verdict is not 'pass'.
+
+    Yields one dict per case: {'case': index, 'verdict': str, 'execution_time', 'memory',
+    'stdout', 'stderr'}, then a final {'summary': {...}} dict. A compile error yields a
+    single 'CE' entry for case None before the summary.
+    """
+    run_limits = default_limits()
+    if limits:
+        run_limits.update(limits)
+    summary = {'total': len(cases), 'run': 0, 'passed': 0, 'verdicts': {}}
+
+    def finish(verdict=None):
+        if verdict:
+            summary['verdicts'][verdict] = summary['verdicts'].get(verdict, 0) + 1
+        return summary
+
+    if language not in LANGUAGES:
+        yield {'case': None, 'verdict': 'SE', 'stderr': f'Unsupported language: {language}'}
+        yield {'summary': finish('SE')}
+        return
+
+    prepared = _submit(_prepare_in_worker, language, code, run_limits)
+    if prepared is None or prepared[1] is not None:
+        error = prepared[1] if prepared else _result(success=False, stderr='Sandbox worker crashed. Please try again.', error_type='sandbox')
+        verdict = _verdict(error, None)
+        yield {'case': None, 'verdict': verdict, 'stdout': error['stdout'], 'stderr': error['stderr']}
+        yield {'summary': finish(verdict)}
+        return
+
+    workdir = prepared[0]
+    try:
+        for index, case in enumerate(cases):
+            expected = case.get('expected_output')
+            result = _submit(_run_case_in_worker, language, workdir, case.get('input') or '', run_limits)
+            if result is None:
+                result = _result(success=False, stderr='Sandbox worker crashed. Please try again.', error_type='sandbox')
+            _count_run(result)
+            verdict = _verdict(result, expected)
+            summary['run'] += 1
+            if verdict == 'pass':
+                summary['passed'] += 1
+            finish(verdict)
+            yield {
+                'case': index,
+                'verdict': verdict,
+                'execution_time': result['execution_time'],
+                'memory': result['memory'],
+                'stdout': result['stdout'],
+                'stderr': result['stderr'],
+            }
+            if stop_on_failure and verdict != 'pass':
+                break
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    yield {'summary': summary}
@@ -0,0 +1,412 @@
+# backend/similarity.py
+
+import re
+import time
+import zlib
+import random
+import struct
+import datetime
+import threading
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import get_history
+
+from database import db, primary_reads
+from models import User, Submission, SubmissionSignature
+
+# Near-duplicate detection for submissions. Code is tokenized with identifiers,
+# literals, comments and whitespace normalized away, cut into overlapping
+# k-token shingles and summarized by a MinHash signature; the fraction of equal
+# signature slots estimates the Jaccard similarity of two submissions' shingles.
+# Signatures are banded into LSH buckets per assignment, so "what looks like X"
+# only compares X with submissions sharing a bucket instead of the whole class.
+#
+# Signatures are persisted in submission_signatures (written in the submitting
+# transaction); like the leaderboards, a process loads an assignment's index on
+# first use, applies its own changes after commit and polls for other processes'.
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS, ROWS = 32, 4 # BANDS * ROWS == NUM_PERM; pairs above ~0.5 similarity almost always share a band
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(0x5EED) # Fixed: signatures are stored, so every process must hash the same way
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_PACK = struct.Struct(f'<{NUM_PERM}I')
+
+# Keywords survive normalization (they carry the program's structure); every
+# other identifier becomes 'V'. Submissions carry no language, so this is the
+# union over the sandbox languages, and '#' / '//' start comments everywhere
+# (Python floor division is lost, equally for every submission of an assignment).
+KEYWORDS = frozenset('''
+    and as assert async await break case catch class const continue def default del delete do elif else enum
+    except export extends extern final finally for from function global goto if implements import in
+    instanceof interface is lambda let long namespace new nonlocal not null or pass private protected public
+    raise return short signed sizeof static struct super switch template this throw throws try typedef typeof
+    union unsigned using var virtual void volatile while with yield
+    int char float double bool boolean byte string String None True False true false nullptr undefined
+'''.split())
+
+_TOKEN = re.compile(r'''
+    (?P<skip>\s+|\#[^\n]*|//[^\n]*|/\*.*?\*/)
+  | (?P<string>"""(?:.|\n)*?"""|\'\'\'(?:.|\n)*?\'\'\'|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)
+  | (?P<number>\d[\w.]*)
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<op>==|!=|<=|>=|&&|\|\||\+\+|--|->|<<|>>|\*\*|[-+*/%&|^]=|\S)
+''', re.VERBOSE | re.DOTALL)
+
+
+def normalize_tokens(code):
+    """Structural tokens of code: keywords and operators kept, names -> 'V', literals -> 'S'/'N'."""
+    tokens = []
+    for match in _TOKEN.finditer(code or ''):
+        kind = match.lastgroup
+        if kind == 'skip':
+            continue
+        if kind == 'name':
+            value = match.group()
+            tokens.append(value if value in KEYWORDS else 'V')
+        elif kind == 'string':
+            tokens.append('S')
+        elif kind == 'number':
+            tokens.append('N')
+        else:
+            tokens.append(match.group())
+    return tokens
+
+
+def shingles(tokens, size=SHINGLE_SIZE):
+    """32-bit hashes of the distinct size-token windows (the whole sequence if shorter)."""
+    if not tokens:
+        return set()
+    if len(tokens) < size:
+        return {zlib.crc32(' '.join(tokens).encode())}
+    return {zlib.crc32(' '.join(tokens[i:i + size]).encode()) for i in range(len(tokens) - size + 1)}
+
+
+def minhash(hashes):
+    """NUM_PERM-slot MinHash signature of a set of shingle hashes."""
+    values = list(hashes)
+    return tuple(min([((a * x + b) % _PRIME) & _MAX_HASH for x in values]) for a, b in _PERMUTATIONS)
+
+
+def signature_for(code):
+    """(signature, token count) for source code, or (None, 0) when it has no tokens."""
+    tokens = normalize_tokens(code)
+    if not tokens:
+        return None, 0
+    return minhash(shingles(tokens)), len(tokens)
+
+
+def pack_signature(signature):
+    return _PACK.pack(*signature)
+
+
+def unpack_signature(data):
+    return _PACK.unpack(data)
+
+
+def estimate_similarity(a, b):
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+class SimilarityIndex:
+    """LSH buckets over one assignment's signatures."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.signatures = {} # submission id -> signature
+        self._buckets = [{} for _ in range(BANDS)] # per band: band slice -> submission ids
+        self.synced_at = None # Newest updated_at seen from the database
+        self.next_poll = 0.0
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def _bands(self, signature):
+        return [signature[band * ROWS:(band + 1) * ROWS] for band in range(BANDS)]
+
+    def add(self, submission_id, signature):
+        with self._lock:
+            self.remove(submission_id)
+            self.signatures[submission_id] = signature
+            for buckets, key in zip(self._buckets, self._bands(signature)):
+                buckets.setdefault(key, set()).add(submission_id)
+
+    def remove(self, submission_id):
+        with self._lock:
+            signature = self.signatures.pop(submission_id, None)
+            if signature is None:
+                return
+            for buckets, key in zip(self._buckets, self._bands(signature)):
+                bucket = buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(submission_id)
+                    if not bucket:
+                        del buckets[key]
+
+    def candidates(self, signature):
+        """Submissions sharing at least one band with signature."""
+        with self._lock:
+            found = set()
+            for buckets, key in zip(self._buckets, self._bands(signature)):
+                found.update(buckets.get(key, ()))
+            return found
+
+    def similar(self, submission_id, threshold):
+        """[(other id, estimated similarity)] at or above threshold, most similar first."""
+        with self._lock:
+            signature = self.signatures.get(submission_id)
+            if signature is None:
+                return []
+            matches = []
+            for other in self.candidates(signature):
+                if other != submission_id:
+                    score = estimate_similarity(signature, self.signatures[other])
+                    if score >= threshold:
+                        matches.append((other, score))
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches
+
+    def clusters(self, threshold):
+        """Groups of submissions linked by pairs at or above threshold: [(member ids, [(a, b, score)])]."""
+        parent = {}
+
+        def find(x):
+            while parent.setdefault(x, x) != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        pairs = []
+        with self._lock:
+            for submission_id in self.signatures:
+                for other, score in self.similar(submission_id, threshold):
+                    if submission_id < other:
+                        pairs.append((submission_id, other, score))
+                        parent[find(submission_id)] = find(other)
+
+        groups = {}
+        for a, b, score in pairs:
+            groups.setdefault(find(a), ([], []))[1].append((a, b, score))
+        for member in parent:
+            root = find(member)
+            if root in groups:
+                groups[root][0].append(member)
+        return [(sorted(members), sorted(group_pairs, key=lambda p: -p[2])) for members, group_pairs in groups.values()]
+
+
+class SimilarityRegistry:
+    """Process-wide per-assignment indexes, loaded lazily from submission_signatures and kept in sync."""
+
+    SYNC_OVERLAP = datetime.timedelta(seconds=5) # Re-read rows this far back to catch late commits
+
+    def __init__(self, sync_interval=5.0, min_tokens=25):
+        self.sync_interval = sync_interval
+        self.min_tokens = min_tokens
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _add_rows(self, index, rows):
+        for submission_id, data, token_count, updated_at in rows:
+            if token_count >= self.min_tokens:
+                index.add(submission_id, unpack_signature(data))
+            else:
+                index.remove(submission_id)
+            if index.synced_at is None or updated_at > index.synced_at:
+                index.synced_at = updated_at
+
+    def _query(self, assignment_id):
+        return select(SubmissionSignature.submission_id, SubmissionSignature.signature,
+                      SubmissionSignature.token_count, SubmissionSignature.updated_at) \
+            .where(SubmissionSignature.assignment_id == assignment_id)
+
+    def _load(self, assignment_id):
+        index = SimilarityIndex()
+        self._add_rows(index, db.session.execute(self._query(assignment_id)))
+        index.next_poll = time.monotonic() + self.sync_interval
+        return index
+
+    def _sync(self, assignment_id, index):
+        """Apply rows other processes changed since the last sync. Deletions are caught at read time (see flagged_clusters)."""
+        now = time.monotonic()
+        if not self.sync_interval or now < index.next_poll:
+            return
+        index.next_poll = now + self.sync_interval
+        query = self._query(assignment_id)
+        if index.synced_at is not None:
+            query = query.where(SubmissionSignature.updated_at >= index.synced_at - self.SYNC_OVERLAP)
+        self._add_rows(index, db.session.execute(query))
+
+    def get(self, assignment_id):
+        """The assignment's index, loading it from the database on first use."""
+        with self._lock:
+            index = self._indexes.get(assignment_id)
+        with primary_reads(): # Polling by updated_at must not miss rows a lagging replica hasn't applied yet
+            if index is None:
+                loaded = self._load(assignment_id)
+                with self._lock:
+                    index = self._indexes.setdefault(assignment_id, loaded)
+            else:
+                self._sync(assignment_id, index)
+        return index
+
+    def apply(self, changes):
+        """Apply committed {submission_id: (assignment_id, signature or None, token count)} to loaded indexes."""
+        with self._lock:
+            indexes = dict(self._indexes)
+        for submission_id, (assignment_id, signature, token_count) in changes.items():
+            for loaded_id, index in indexes.items():
+                if loaded_id != assignment_id:
+                    index.remove(submission_id) # Moved to another assignment
+            index = indexes.get(assignment_id)
+            if index is None:
+                continue
+            if signature is not None and token_count >= self.min_tokens:
+                index.add(submission_id, signature)
+            else:
+                index.remove(submission_id)
+
+    def reset(self):
+        with self._lock:
+            self._indexes.clear()
+
+
+similarity_indexes = SimilarityRegistry()
+
+
+def init_similarity(app):
+    similarity_indexes.sync_interval = app.config['SIMILARITY_SYNC_INTERVAL']
+    similarity_indexes.min_tokens = app.config['SIMILARITY_MIN_TOKENS']
+    return similarity_indexes
+
+
+# --- Queries --- #
+
+def _describe(submission_ids):
+    """{submission id: public fields} for submissions that still exist."""
+    if not submission_ids:
+        return {}
+    rows = db.session.execute(
+        select(Submission.id, Submission.submitted_at, User.id, User.unique_id, User.full_name)
+        .join(User, User.id == Submission.student_id)
+        .where(Submission.id.in_(submission_ids))
+    ).all()
+    return {
+        submission_id: {'submissionId': submission_id, 'studentUserId': user_id, 'studentId': unique_id,
+                        'studentName': name, 'submittedAt': submitted_at.isoformat() if submitted_at else None}
+        for submission_id, submitted_at, user_id, unique_id, name in rows
+    }
+
+
+def _drop_missing(index, submission_ids, found):
+    for submission_id in set(submission_ids) - set(found):
+        index.remove(submission_id) # Deleted by another process
+
+
+def similar_submissions(assignment_id, submission_id, threshold):
+    """Submissions of the assignment at least threshold similar to submission_id, most similar first."""
+    index = similarity_indexes.get(assignment_id)
+    matches = index.similar(submission_id, threshold)
+    described = _describe([other for other, _ in matches])
+    _drop_missing(index, [other for other, _ in matches], described)
+    return [dict(described[other], similarity=round(score, 3)) for other, score in matches if other in described]
+
+
+def flagged_clusters(assignment_id, threshold):
+    """Clusters of near-duplicate submissions for one assignment, largest and closest first."""
+    index = similarity_indexes.get(assignment_id)
+    clusters = index.clusters(threshold)
+    described = _describe([member for members, _ in clusters for member in members])
+    _drop_missing(index, [member for members, _ in clusters for member in members], described)
+
+    flagged = []
+    for members, pairs in clusters:
+        pairs = [(a, b, score) for a, b, score in pairs if a in described and b in described]
+        if not pairs:
+            continue
+        linked = {a for a, _, _ in pairs} | {b for _, b, _ in pairs}
+        flagged.append({
+            'size': len(linked),
+            'maxSimilarity': round(pairs[0][2], 3),
+            'submissions': [described[member] for member in members if member in linked],
+            'pairs': [{'a': a, 'b': b, 'similarity': round(score, 3)} for a, b, score in pairs],
+        })
+    flagged.sort(key=lambda cluster: (-cluster['size'], -cluster['maxSimilarity']))
+    return {'indexed': len(index), 'clusters': flagged}
+
+
+# --- Submission Hooks --- #
+# Signatures are written in the submitting transaction; the in-memory changes
+# are parked on the session and applied only after commit.
+
+def _store(connection, target, signature, token_count):
+    table = SubmissionSignature.__table__
+    connection.execute(table.delete().where(table.c.submission_id == target.id))
+    if signature is not None:
+        connection.execute(table.insert().values(submission_id=target.id, assignment_id=target.assignment_id,
+                                                 signature=pack_signature(signature), token_count=token_count,
+                                                 updated_at=datetime.datetime.utcnow()))
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('similarity_changes', {})[target.id] = (target.assignment_id, signature, token_count)
+
+
+@event.listens_for(Submission, 'after_insert')
+def _signed_on_insert(mapper, connection, target):
+    _store(connection, target, *signature_for(target.content))
+
+
+@event.listens_for(Submission, 'after_update')
+def _resigned(mapper, connection, target):
+    if get_history(target, 'content').has_changes() or get_history(target, 'assignment_id').has_changes():
+        _store(connection, target, *signature_for(target.content))
+
+
+@event.listens_for(Submission, 'before_delete')
+def _unsigned(mapper, connection, target):
+    _store(connection, target, None, 0) # Before the submission row goes: the signature references it
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed(session):
+    changes = session.info.pop('similarity_changes', None)
+    if changes:
+        similarity_indexes.apply(changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_rolled_back(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop('similarity_changes', None)
+
+
+# --- Rebuild --- #
+
+def rebuild_signatures(batch_size=500):
+    """Recompute every submission's signature (e.g. to backfill existing submissions). Returns the count."""
+    table = SubmissionSignature.__table__
+    db.session.execute(table.delete())
+    count, last_id = 0, 0
+    while True: # Keyset batches, so inserts never interleave with an open server-side cursor
+        rows = db.session.execute(
+            select(Submission.id, Submission.assignment_id, Submission.content)
+            .where(Submission.id > last_id).order_by(Submission.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        now = datetime.datetime.utcnow()
+        values = []
+        for submission_id, assignment_id, content in rows:
+            signature, token_count = signature_for(content)
+            if signature is not None:
+                values.append({'submission_id': submission_id, 'assignment_id': assignment_id,
+                               'signature': pack_signature(signature), 'token_count': token_count, 'updated_at': now})
+        if values:
+            db.session.execute(table.insert(), values)
+            count += len(values)
+    db.session.commit()
+    similarity_indexes.reset()
+    return count
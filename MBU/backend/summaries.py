@@ -0,0 +1,361 @@
+# backend/summaries.py
+
+import datetime
+from collections import defaultdict
+
+from sqlalchemy import event, select, func, case, or_, and_, cast, bindparam, Integer
+from sqlalchemy.orm.attributes import get_history
+
+from database import db, upsert
+from models import Enrollment, Assignment, Submission, Attendance, StudentSummary
+
+# Student summaries are kept current by ORM events on Attendance, Submission,
+# Assignment and Enrollment: each flush applies an atomic SQL increment to the
+# affected rows inside the same transaction, so the dashboard reads one row
+# instead of scanning history. Writes that bypass the ORM unit of work (bulk
+# INSERT/UPDATE, raw SQL) must call apply_attendance_changes() or
+# rebuild_summaries() themselves. Deleting assignments or enrollments is not
+# tracked incrementally; run `flask rebuild-summaries` afterwards.
+
+summaries = StudentSummary.__table__
+
+BADGE_RULES = [
+    ('First Submission', lambda s: s.submission_count >= 1),
+    ('Problem Solver', lambda s: s.submission_count >= 10),
+    ('Top Graded', lambda s: s.graded_count >= 10),
+    ('10-Day Streak', lambda s: s.longest_streak >= 10),
+    ('30-Day Streak', lambda s: s.longest_streak >= 30),
+    ('Perfect Attendance', lambda s: s.attendance_total >= 10 and s.attendance_present == s.attendance_total),
+]
+
+
+def summary_badges(summary):
+    """Badges earned, derived from the summary counters."""
+    return [name for name, earned in BADGE_RULES if earned(summary)]
+
+
+def empty_summary(student_id):
+    """Unsaved all-zero summary for a student with no activity yet (column defaults only apply on insert)."""
+    return StudentSummary(student_id=student_id, attendance_present=0, attendance_total=0, pending_count=0,
+                          submission_count=0, graded_count=0, current_streak=0, longest_streak=0)
+
+
+def summary_current_streak(summary, today=None):
+    """Streak as of today: a streak whose last active day is before yesterday has lapsed."""
+    today = today or datetime.date.today()
+    if summary.last_active_date is None or summary.last_active_date < today - datetime.timedelta(days=1):
+        return 0
+    return summary.current_streak
+
+
+# --- Incremental Updates (SQL increments, run on the flush's connection) --- #
+
+def _ensure(connection, student_ids):
+    """Create missing summary rows. Returns {student_id: last_active_date} for student_ids."""
+    rows = connection.execute(
+        select(summaries.c.student_id, summaries.c.last_active_date).where(summaries.c.student_id.in_(student_ids))
+    )
+    last_active = {sid: _as_date(day) for sid, day in rows}
+    missing = [sid for sid in student_ids if sid not in last_active]
+    if missing:
+        # Upsert: another transaction may be creating the same student's row right now
+        upsert(connection, summaries, [{'student_id': sid} for sid in missing], ['student_id'])
+        last_active.update(dict.fromkeys(missing))
+    return last_active
+
+
+def _bump(connection, student_ids, **deltas):
+    """Add deltas to the named counters of every student in student_ids (one UPDATE)."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas or not student_ids:
+        return
+    _ensure(connection, student_ids)
+    connection.execute(
+        summaries.update()
+        .where(summaries.c.student_id.in_(student_ids))
+        .values({summaries.c[name]: summaries.c[name] + delta for name, delta in deltas.items()})
+    )
+
+
+def _recount_streaks(connection, student_ids):
+    """Recompute streaks of student_ids from their attendance and submission history."""
+    if not student_ids:
+        return
+    _ensure(connection, student_ids)
+    days = _activity_days(connection, student_ids)
+    connection.execute(
+        summaries.update().where(summaries.c.student_id == bindparam('sid')).values(
+            current_streak=bindparam('current'), longest_streak=bindparam('longest'), last_active_date=bindparam('last')),
+        [dict(zip(('current', 'longest', 'last'), _streaks(sorted(days.get(sid, ())))), sid=sid) for sid in student_ids]
+    )
+
+
+def _touch(connection, student_ids, day):
+    """Record activity on day for student_ids and extend/reset their streaks."""
+    if not student_ids:
+        return
+    last_active = _ensure(connection, student_ids)
+    backfilled = [sid for sid, last in last_active.items() if last is not None and day < last]
+    # Activity older than the last active day (e.g. an absence corrected later) can join two runs: recount
+    _recount_streaks(connection, backfilled)
+    forward = [sid for sid in student_ids if sid not in backfilled]
+    if not forward:
+        return
+    last = summaries.c.last_active_date
+    # ordered_values: MySQL evaluates SET left to right, so current_streak must read the old last_active_date
+    connection.execute(
+        summaries.update()
+        .where(summaries.c.student_id.in_(forward))
+        .ordered_values(
+            (summaries.c.current_streak, case(
+                (last.is_(None), 1),
+                (last == day - datetime.timedelta(days=1), summaries.c.current_streak + 1),
+                (last < day, 1),
+                else_=summaries.c.current_streak,
+            )),
+            (last, case((or_(last.is_(None), last < day), day), else_=last)),
+        )
+    )
+    connection.execute(
+        summaries.update()
+        .where(and_(summaries.c.student_id.in_(forward), summaries.c.current_streak > summaries.c.longest_streak))
+        .values(longest_streak=summaries.c.current_streak)
+    )
+
+
+def _load_previous(target, value, oldvalue, initiator):
+    """No-op set listener: registering it with active_history loads the old value before an
+    expired attribute is overwritten, so _changed can compute the delta."""
+
+
+for _attribute in (Attendance.is_present, Submission.grade):
+    event.listen(_attribute, 'set', _load_previous, active_history=True)
+
+
+def _changed(target, attr):
+    history = get_history(target, attr)
+    if not history.has_changes():
+        return None
+    old = history.deleted[0] if history.deleted else None
+    new = history.added[0] if history.added else None
+    return old, new
+
+
+@event.listens_for(Attendance, 'after_insert')
+def _attendance_inserted(mapper, connection, target):
+    _bump(connection, [target.student_id], attendance_total=1, attendance_present=int(bool(target.is_present)))
+    if target.is_present:
+        _touch(connection, [target.student_id], target.date)
+
+
+@event.listens_for(Attendance, 'after_update')
+def _attendance_updated(mapper, connection, target):
+    change = _changed(target, 'is_present')
+    if change:
+        old, new = change
+        _bump(connection, [target.student_id], attendance_present=int(bool(new)) - int(bool(old)))
+        if new:
+            _touch(connection, [target.student_id], target.date)
+        else:
+            # A removed active day can split a run (or end the latest one): recount
+            _recount_streaks(connection, [target.student_id])
+
+
+@event.listens_for(Attendance, 'after_delete')
+def _attendance_deleted(mapper, connection, target):
+    _bump(connection, [target.student_id], attendance_total=-1, attendance_present=-int(bool(target.is_present)))
+    if target.is_present:
+        _recount_streaks(connection, [target.student_id])
+
+
+def _is_enrolled(connection, student_id, assignment_id):
+    """Whether the student is enrolled in the assignment's course (only then does it count as pending)."""
+    course_id = select(Assignment.course_id).where(Assignment.id == assignment_id).scalar_subquery()
+    return connection.execute(
+        select(Enrollment.id).where(Enrollment.student_id == student_id, Enrollment.course_id == course_id)
+    ).first() is not None
+
+
+@event.listens_for(Submission, 'after_insert')
+def _submission_inserted(mapper, connection, target):
+    pending = -1 if _is_enrolled(connection, target.student_id, target.assignment_id) else 0
+    _bump(connection, [target.student_id], submission_count=1, pending_count=pending,
+          graded_count=int(target.grade is not None))
+    _touch(connection, [target.student_id], (target.submitted_at or datetime.datetime.utcnow()).date())
+
+
+@event.listens_for(Submission, 'after_update')
+def _submission_updated(mapper, connection, target):
+    change = _changed(target, 'grade')
+    if change:
+        old, new = change
+        _bump(connection, [target.student_id], graded_count=int(new is not None) - int(old is not None))
+
+
+@event.listens_for(Submission, 'after_delete')
+def _submission_deleted(mapper, connection, target):
+    pending = 1 if _is_enrolled(connection, target.student_id, target.assignment_id) else 0
+    _bump(connection, [target.student_id], submission_count=-1, pending_count=pending,
+          graded_count=-int(target.grade is not None))
+    _recount_streaks(connection, [target.student_id])
+
+
+@event.listens_for(Assignment, 'after_insert')
+def _assignment_inserted(mapper, connection, target):
+    enrolled = select(Enrollment.student_id).where(Enrollment.course_id == target.course_id)
+    missing = enrolled.where(Enrollment.student_id.not_in(select(summaries.c.student_id)))
+    connection.execute(summaries.insert().from_select(['student_id'], missing))
+    connection.execute(
+        summaries.update()
+        .where(summaries.c.student_id.in_(enrolled))
+        .values(pending_count=summaries.c.pending_count + 1)
+    )
+
+
+def _open_assignments(connection, student_id, course_id):
+    submitted = select(Submission.assignment_id).where(Submission.student_id == student_id)
+    return connection.execute(
+        select(func.count(Assignment.id))
+        .where(Assignment.course_id == course_id, Assignment.id.not_in(submitted))
+    ).scalar() or 0
+
+
+@event.listens_for(Enrollment, 'after_insert')
+def _enrollment_inserted(mapper, connection, target):
+    _bump(connection, [target.student_id], pending_count=_open_assignments(connection, target.student_id, target.course_id))
+
+
+@event.listens_for(Enrollment, 'after_delete')
+def _enrollment_deleted(mapper, connection, target):
+    _bump(connection, [target.student_id], pending_count=-_open_assignments(connection, target.student_id, target.course_id))
+
+
+def apply_attendance_changes(connection, day, changes):
+    """Apply attendance rows for one day written outside the ORM (bulk upserts).
+
+    changes: list of (student_id, old_is_present or None for a new row, new_is_present).
+    Runs a fixed number of set-based statements however many students changed.
+    """
+    groups = defaultdict(list)
+    for student_id, old, new in changes:
+        groups[(int(old is None), int(bool(new)) - int(bool(old)))].append(student_id)
+    for (added, present_delta), student_ids in groups.items():
+        _bump(connection, student_ids, attendance_total=added, attendance_present=present_delta)
+    _touch(connection, [sid for sid, old, new in changes if new and not old], day)
+    _recount_streaks(connection, [sid for sid, old, new in changes if old and not new])
+
+
+# --- Rebuild & Consistency Check (full recomputation from history) --- #
+
+SUMMARY_FIELDS = ('attendance_present', 'attendance_total', 'pending_count', 'submission_count',
+                  'graded_count', 'current_streak', 'longest_streak', 'last_active_date')
+
+
+def _streaks(days):
+    """(current, longest, last) for an ascending list of distinct active days."""
+    current = longest = 0
+    previous = None
+    for day in days:
+        current = current + 1 if previous is not None and day == previous + datetime.timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest, previous
+
+
+def _as_date(value):
+    if isinstance(value, str): # SQLite returns DATE() as text
+        return datetime.date.fromisoformat(value)
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return value
+
+
+def _activity_days(connection, student_ids=None):
+    """{student_id: set of active days} (present in class or submitted), optionally for some students."""
+    def scoped(query, column):
+        return query.where(column.in_(student_ids)) if student_ids is not None else query
+
+    activity = scoped(
+        select(Attendance.student_id.label('sid'), Attendance.date.label('day')).where(Attendance.is_present.is_(True)),
+        Attendance.student_id,
+    ).union(scoped(
+        select(Submission.student_id, func.date(Submission.submitted_at)), Submission.student_id,
+    )).subquery()
+    days = defaultdict(set)
+    for sid, day in connection.execute(select(activity.c.sid, activity.c.day)):
+        days[sid].add(_as_date(day))
+    return days
+
+
+def compute_summaries(student_ids=None):
+    """Recompute summary values from history with a fixed number of aggregate queries.
+
+    Returns {student_id: {field: value}} for every student with any history.
+    """
+    def scoped(query, column):
+        return query.where(column.in_(student_ids)) if student_ids is not None else query
+
+    values = defaultdict(lambda: dict.fromkeys(SUMMARY_FIELDS, 0) | {'last_active_date': None})
+    session = db.session
+
+    for sid, total, present in session.execute(scoped(
+            select(Attendance.student_id, func.count(Attendance.id), func.sum(cast(Attendance.is_present, Integer)))
+            .group_by(Attendance.student_id), Attendance.student_id)):
+        values[sid].update(attendance_total=total, attendance_present=int(present or 0))
+
+    for sid, count, graded in session.execute(scoped(
+            select(Submission.student_id, func.count(Submission.id), func.count(Submission.grade))
+            .group_by(Submission.student_id), Submission.student_id)):
+        values[sid].update(submission_count=count, graded_count=graded)
+
+    open_assignments = (
+        select(Enrollment.student_id, func.count(Assignment.id))
+        .join(Assignment, Assignment.course_id == Enrollment.course_id)
+        .outerjoin(Submission, and_(Submission.assignment_id == Assignment.id, Submission.student_id == Enrollment.student_id))
+        .where(Submission.id.is_(None))
+        .group_by(Enrollment.student_id)
+    )
+    for sid, pending in session.execute(scoped(open_assignments, Enrollment.student_id)):
+        values[sid]['pending_count'] = pending
+
+    days_by_student = _activity_days(session, student_ids)
+    for sid, days in days_by_student.items():
+        current, longest, last = _streaks(sorted(days))
+        values[sid].update(current_streak=current, longest_streak=longest, last_active_date=last)
+
+    return dict(values)
+
+
+def rebuild_summaries(student_ids=None):
+    """Replace stored summaries with values recomputed from history. Returns the row count."""
+    computed = compute_summaries(student_ids)
+    delete = summaries.delete()
+    if student_ids is not None:
+        delete = delete.where(summaries.c.student_id.in_(student_ids))
+    db.session.execute(delete)
+    if computed:
+        now = datetime.datetime.utcnow()
+        db.session.execute(summaries.insert(), [dict(v, student_id=sid, updated_at=now) for sid, v in computed.items()])
+    db.session.commit()
+    return len(computed)
+
+
+def check_summaries(student_ids=None):
+    """Compare stored summaries with recomputed ones. Returns a list of mismatch dicts."""
+    computed = compute_summaries(student_ids)
+    stored_query = select(summaries)
+    if student_ids is not None:
+        stored_query = stored_query.where(summaries.c.student_id.in_(student_ids))
+    stored = {row.student_id: row for row in db.session.execute(stored_query)}
+    empty = dict.fromkeys(SUMMARY_FIELDS, 0) | {'last_active_date': None}
+
+    mismatches = []
+    for sid in set(computed) | set(stored):
+        expected = computed.get(sid, empty)
+        row = stored.get(sid)
+        actual = {field: getattr(row, field) for field in SUMMARY_FIELDS} if row else empty
+        diff = {field: {'stored': actual[field], 'expected': expected[field]}
+                for field in SUMMARY_FIELDS if actual[field] != expected[field]}
+        if diff:
+            mismatches.append({'student_id': sid, 'fields': diff})
+    return mismatches
@@ -0,0 +1,114 @@
+# backend/tests/test_attendance.py
+
+import os
+import sys
+import datetime
+import itertools
+import tempfile
+
+import pytest
+
+# Config reads DATABASE_URL at import time, so point it at a scratch SQLite file first
+_db_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'attendance.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as database_module # noqa: E402
+from app import app # noqa: E402
+from attendance import mark_attendance # noqa: E402
+from database import db # noqa: E402
+from models import User, UserRole, Course, Enrollment, Attendance, StudentSummary # noqa: E402
+from summaries import check_summaries # noqa: E402
+
+TODAY = datetime.date.today()
+_ids = itertools.count()
+
+
+def days_ago(n):
+    return TODAY - datetime.timedelta(days=n)
+
+
+@pytest.fixture(scope='module')
+def database():
+    with app.app_context():
+        db.create_all()
+    yield
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture
+def roster(database):
+    """(course, [student unique_ids]) with three enrolled students, inside an app context."""
+    n = next(_ids)
+    with app.app_context():
+        course = Course(course_code=f'ATT-{n}', title='Attendance')
+        students = [User(unique_id=f'ATT{n}-{k}', email=f'att{n}-{k}@example.com', full_name=f'Attendance Student {k}',
+                         password='pw', role=UserRole.STUDENT) for k in range(3)]
+        db.session.add(course)
+        db.session.add_all(students)
+        db.session.flush()
+        db.session.add_all([Enrollment(student_id=s.id, course_id=course.id) for s in students])
+        db.session.commit()
+        yield course, [s.unique_id for s in students]
+
+
+def mark(course, day, present, absent):
+    counts, changed = mark_attendance(course.id, day, present, absent)
+    db.session.commit()
+    return counts, changed
+
+
+def streaks(unique_id):
+    db.session.expire_all()
+    user = User.query.filter_by(unique_id=unique_id).one()
+    summary = db.session.get(StudentSummary, user.id)
+    return summary.current_streak, summary.longest_streak
+
+
+def test_same_sheet_twice_writes_nothing_the_second_time(roster):
+    course, ids = roster
+    counts, changed = mark(course, TODAY, ids[:2], ids[2:])
+    assert (counts['inserted'], counts['updated'], len(changed)) == (3, 0, 3)
+    assert check_summaries() == []
+
+    counts, changed = mark(course, TODAY, ids[:2], ids[2:])
+    assert (counts['inserted'], counts['updated'], counts['unchanged'], changed) == (0, 0, 3, [])
+    assert check_summaries() == []
+    assert Attendance.query.filter_by(course_id=course.id).count() == 3
+
+
+def test_bulk_present_absent_present_flips(roster):
+    course, ids = roster
+    for n in (2, 1, 0):
+        mark(course, days_ago(n), ids, [])
+    assert streaks(ids[0]) == (3, 3)
+
+    counts, changed = mark(course, days_ago(1), ids[1:], ids[:1])
+    assert (counts['updated'], len(changed)) == (1, 1)
+    assert check_summaries() == []
+    assert streaks(ids[0]) == (1, 1)
+    assert streaks(ids[1]) == (3, 3)
+
+    mark(course, days_ago(1), ids, [])
+    assert check_summaries() == []
+    assert streaks(ids[0]) == (3, 3)
+
+
+def test_rejected_ids_are_reported_and_not_written(roster):
+    course, ids = roster
+    counts, _ = mark(course, TODAY, [ids[0], ids[1], 'NOPE'], [ids[1]])
+    assert counts['rejectedIds'] == sorted([ids[1], 'NOPE'])
+    assert Attendance.query.filter_by(course_id=course.id).count() == 1
+    assert check_summaries() == []
+
+
+def test_per_row_merge_on_dialects_without_an_upsert(roster, monkeypatch):
+    monkeypatch.setattr(database_module, '_UPSERT_INSERTS', {})
+    course, ids = roster
+    mark(course, TODAY, ids, [])
+    counts, _ = mark(course, TODAY, ids[1:], ids[:1])
+    assert counts['updated'] == 1
+    assert [a.is_present for a in Attendance.query.filter_by(course_id=course.id).order_by(Attendance.student_id)] == \
+        [False, True, True]
+    assert check_summaries() == []
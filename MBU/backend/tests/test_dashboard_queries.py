@@ -0,0 +1,79 @@
+# backend/tests/test_dashboard_queries.py
+
+import os
+import sys
+import datetime
+import tempfile
+
+import pytest
+from sqlalchemy import event
+
+# Config reads DATABASE_URL at import time, so point it at a scratch SQLite file first
+_db_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'dashboard_queries.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, create_access_token # noqa: E402
+from database import db # noqa: E402
+from models import User, UserRole, Course, Enrollment, Assignment, Submission, Attendance # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def client():
+    with app.app_context():
+        db.create_all()
+    yield app.test_client()
+    with app.app_context():
+        db.drop_all()
+
+
+def _student_with_courses(course_count):
+    """A fresh student enrolled in course_count courses, each with attendance, assignments and a submission."""
+    today = datetime.date.today()
+    student = User(unique_id=f'QS{course_count}', email=f'qs{course_count}@example.com',
+                   full_name=f'Query Student {course_count}', password='pw', role=UserRole.STUDENT)
+    db.session.add(student)
+    db.session.flush()
+    for n in range(course_count):
+        course = Course(course_code=f'Q{course_count}-{n}', title=f'Course {n}')
+        db.session.add(course)
+        db.session.flush()
+        db.session.add(Enrollment(student_id=student.id, course_id=course.id))
+        assignments = [Assignment(course_id=course.id, title=f'Lab {k}', due_date=today + datetime.timedelta(days=k))
+                       for k in range(2)]
+        db.session.add_all(assignments)
+        db.session.flush()
+        db.session.add(Submission(student_id=student.id, assignment_id=assignments[0].id, content='print(1)'))
+        db.session.add_all([Attendance(student_id=student.id, course_id=course.id,
+                                       date=today - datetime.timedelta(days=d), is_present=d % 2 == 0)
+                            for d in range(3)])
+    db.session.commit()
+    return student
+
+
+def _dashboard_queries(client, course_count):
+    """(number of SQL statements, payload) for one uncached student dashboard request."""
+    with app.app_context():
+        student = _student_with_courses(course_count)
+        headers = {'Authorization': 'Bearer ' + create_access_token(student)}
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            response = client.get('/api/student/dashboard_data', headers=headers)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+    assert response.status_code == 200
+    return len(statements), response.get_json()
+
+
+def test_student_dashboard_query_count_is_independent_of_course_count(client):
+    few, few_payload = _dashboard_queries(client, 5)
+    many, many_payload = _dashboard_queries(client, 50)
+
+    assert len(few_payload['detailedAttendance']) == 5
+    assert len(many_payload['detailedAttendance']) == 50
+    assert few == many
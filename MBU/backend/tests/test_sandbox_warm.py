@@ -0,0 +1,73 @@
+# backend/tests/test_sandbox_warm.py
+
+import os
+import sys
+import shutil
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sandbox_executor # noqa: E402
+from config import Config # noqa: E402
+
+PROGRAMS = {
+    'python': (
+        "import sys\n"
+        "def main():\n"
+        "    print('ran', __name__, sys.argv, input())\n"
+        "if __name__ == '__main__':\n"
+        "    main()\n"
+    ),
+    'javascript': (
+        "function main() {\n"
+        "  const line = require('fs').readFileSync(0, 'utf8').trim();\n"
+        "  console.log('ran', require.main === module, process.argv.length, line);\n"
+        "}\n"
+        "if (require.main === module) main();\n"
+    ),
+}
+RUNTIMES = {'python': sys.executable, 'javascript': 'node'}
+
+
+def _run(language, warm, monkeypatch):
+    """Run PROGRAMS[language] once in this process, on a warm interpreter or a cold start."""
+    monkeypatch.setattr(Config, 'SANDBOX_WARM_PER_LANGUAGE', 1 if warm else 0)
+    limits = sandbox_executor.default_limits()
+    sandbox_executor._discard_all_warm()
+    sandbox_executor._refill_warm(language)
+    workdir, error = sandbox_executor._prepare_in_worker(language, PROGRAMS[language], limits)
+    assert error is None
+    try:
+        return sandbox_executor._run_program(language, workdir, 'hello\n', limits)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        sandbox_executor._discard_all_warm()
+
+
+@pytest.mark.parametrize('language', sorted(PROGRAMS))
+def test_warm_and_cold_runs_behave_the_same(language, monkeypatch):
+    if shutil.which(RUNTIMES[language]) is None:
+        pytest.skip(f'{RUNTIMES[language]} is not installed')
+    cold = _run(language, False, monkeypatch)
+    warm = _run(language, True, monkeypatch)
+
+    assert (cold['warm'], warm['warm']) == (False, True)
+    assert cold['error_type'] is None
+    assert cold['stdout'].startswith('ran')
+    assert (warm['stdout'], warm['stderr'], warm['exit_code'], warm['error_type']) == \
+        (cold['stdout'], cold['stderr'], cold['exit_code'], cold['error_type'])
+
+
+def test_limit_overrides_run_cold_and_keep_no_interpreters(monkeypatch):
+    monkeypatch.setattr(Config, 'SANDBOX_WARM_PER_LANGUAGE', 1)
+    limits = dict(sandbox_executor.default_limits(), memory_mb=sandbox_executor.default_limits()['memory_mb'] + 1)
+    sandbox_executor._discard_all_warm()
+    workdir, _ = sandbox_executor._prepare_in_worker('python', PROGRAMS['python'], limits)
+    try:
+        result = sandbox_executor._run_program('python', workdir, 'hello\n', limits)
+        assert result['warm'] is False
+        assert {language: len(idle) for language, idle in sandbox_executor._warm.items() if idle} == {'python': 1}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        sandbox_executor._discard_all_warm()
@@ -0,0 +1,150 @@
+# backend/tests/test_summaries.py
+
+import os
+import sys
+import datetime
+import itertools
+import tempfile
+
+import pytest
+
+# Config reads DATABASE_URL at import time, so point it at a scratch SQLite file first
+_db_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'summaries.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app # noqa: E402
+from database import db # noqa: E402
+from models import User, UserRole, Course, Enrollment, Assignment, Submission, Attendance, StudentSummary # noqa: E402
+from summaries import check_summaries # noqa: E402
+
+TODAY = datetime.date.today()
+_ids = itertools.count()
+
+
+def days_ago(n):
+    return TODAY - datetime.timedelta(days=n)
+
+
+@pytest.fixture(scope='module')
+def database():
+    with app.app_context():
+        db.create_all()
+    yield
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture
+def student(database):
+    """(student, course) with the student enrolled, inside an app context."""
+    n = next(_ids)
+    with app.app_context():
+        user = User(unique_id=f'SUM{n}', email=f'sum{n}@example.com', full_name=f'Summary Student {n}',
+                    password='pw', role=UserRole.STUDENT)
+        course = Course(course_code=f'SUM-{n}', title='Summaries')
+        db.session.add_all([user, course])
+        db.session.flush()
+        db.session.add(Enrollment(student_id=user.id, course_id=course.id))
+        db.session.commit()
+        yield user, course
+
+
+def assert_consistent(user):
+    assert check_summaries([user.id]) == []
+
+
+def summary(user):
+    db.session.expire_all()
+    return db.session.get(StudentSummary, user.id)
+
+
+def test_submission_insert_regrade_and_delete(student):
+    user, course = student
+    assignments = [Assignment(course_id=course.id, title=f'Lab {k}', due_date=TODAY) for k in range(2)]
+    db.session.add_all(assignments)
+    db.session.commit()
+    assert summary(user).pending_count == 2
+
+    submission = Submission(student_id=user.id, assignment_id=assignments[0].id, content='print(1)')
+    db.session.add(submission)
+    db.session.commit()
+    assert_consistent(user)
+    assert (summary(user).submission_count, summary(user).pending_count) == (1, 1)
+
+    submission.grade = 'A'
+    db.session.commit()
+    assert_consistent(user)
+    submission.grade = 'B' # Regrade of a graded submission
+    db.session.commit()
+    assert_consistent(user)
+    assert summary(user).graded_count == 1
+
+    db.session.delete(submission)
+    db.session.commit()
+    assert_consistent(user)
+    assert (summary(user).submission_count, summary(user).graded_count, summary(user).pending_count) == (0, 0, 2)
+
+
+def test_submission_outside_enrolled_courses_is_not_pending(student):
+    user, _ = student
+    other = Course(course_code=f'SUM-OTHER-{user.id}', title='Not enrolled')
+    db.session.add(other)
+    db.session.flush()
+    assignment = Assignment(course_id=other.id, title='Lab', due_date=TODAY)
+    db.session.add(assignment)
+    db.session.commit()
+
+    submission = Submission(student_id=user.id, assignment_id=assignment.id, content='print(1)')
+    db.session.add(submission)
+    db.session.commit()
+    assert summary(user).pending_count == 0
+    assert_consistent(user)
+
+    db.session.delete(submission)
+    db.session.commit()
+    assert summary(user).pending_count == 0
+    assert_consistent(user)
+
+
+def test_present_absent_present_flips(student):
+    user, course = student
+    marks = [Attendance(student_id=user.id, course_id=course.id, date=days_ago(n), is_present=True) for n in (2, 1, 0)]
+    db.session.add_all(marks)
+    db.session.commit()
+    assert (summary(user).current_streak, summary(user).longest_streak) == (3, 3)
+
+    marks[1].is_present = False
+    db.session.commit()
+    assert_consistent(user)
+    assert (summary(user).current_streak, summary(user).longest_streak) == (1, 1)
+
+    marks[1].is_present = True
+    db.session.commit()
+    assert_consistent(user)
+    assert (summary(user).current_streak, summary(user).longest_streak) == (3, 3)
+
+    db.session.delete(marks[2])
+    db.session.commit()
+    assert_consistent(user)
+    assert summary(user).last_active_date == days_ago(1)
+
+
+def test_backdated_correction_joins_two_runs(student):
+    user, course = student
+    db.session.add_all([Attendance(student_id=user.id, course_id=course.id, date=days_ago(n), is_present=n != 1)
+                        for n in (3, 2, 1, 0)])
+    db.session.commit()
+    assert (summary(user).current_streak, summary(user).longest_streak) == (1, 2)
+
+    corrected = Attendance.query.filter_by(student_id=user.id, date=days_ago(1)).one()
+    corrected.is_present = True
+    db.session.commit()
+    assert_consistent(user)
+    assert (summary(user).current_streak, summary(user).longest_streak) == (4, 4)
+
+    # A day before the first one, recorded late
+    db.session.add(Attendance(student_id=user.id, course_id=course.id, date=days_ago(4), is_present=True))
+    db.session.commit()
+    assert_consistent(user)
+    assert (summary(user).current_streak, summary(user).longest_streak, summary(user).last_active_date) == (5, 5, TODAY)
@@ -0,0 +1,153 @@
+# backend/user_import.py
+
+import io
+import csv
+
+from sqlalchemy import select, or_
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models import User, UserRole
+from passwords import hash_passwords
+
+# Streaming CSV import. Rows are read a chunk at a time; each chunk is checked
+# against the database with one set-based query, its passwords are hashed on the
+# bulk process pool, and its users are inserted with one executemany INSERT.
+# Memory stays proportional to the chunk size, not the file.
+
+# Accepted header spellings -> User field (the signup form calls them userid/name)
+COLUMN_ALIASES = {
+    'unique_id': 'unique_id', 'userid': 'unique_id', 'user_id': 'unique_id', 'id': 'unique_id',
+    'email': 'email',
+    'full_name': 'full_name', 'name': 'full_name',
+    'role': 'role',
+    'password': 'password',
+}
+REQUIRED_COLUMNS = ('unique_id', 'email', 'full_name', 'password')
+IMPORTABLE_ROLES = {UserRole.STUDENT.value: UserRole.STUDENT, UserRole.FACULTY.value: UserRole.FACULTY}
+MAX_LENGTHS = {'unique_id': 80, 'email': 120, 'full_name': 100}
+
+
+class ImportFormatError(ValueError):
+    """The upload is not a usable CSV (unreadable or missing required columns)."""
+
+
+def _validate(line, raw, seen_ids, seen_emails):
+    """Normalize one CSV row. Returns (row dict, None) or (None, error report)."""
+    row = {field: (raw.get(field) or '').strip() for field in REQUIRED_COLUMNS + ('role',)}
+    row['email'] = row['email'].lower()
+    errors = [f'{field} is required' for field in REQUIRED_COLUMNS if not row[field]]
+    errors += [f'{field} is longer than {limit} characters' for field, limit in MAX_LENGTHS.items() if len(row[field]) > limit]
+    if row['email'] and '@' not in row['email']:
+        errors.append('email is not valid')
+    role = IMPORTABLE_ROLES.get((row['role'] or UserRole.STUDENT.value).lower())
+    if role is None:
+        errors.append(f"role must be one of: {', '.join(IMPORTABLE_ROLES)}")
+    row['role'] = role
+    if row['unique_id'] in seen_ids:
+        errors.append('unique_id is repeated earlier in the file')
+    if row['email'] in seen_emails:
+        errors.append('email is repeated earlier in the file')
+    seen_ids.add(row['unique_id'])
+    seen_emails.add(row['email'])
+    if errors:
+        return None, {'row': line, 'unique_id': row['unique_id'], 'email': row['email'], 'errors': errors}
+    return dict(row, line=line), None
+
+
+def _existing(rows):
+    """Sets of unique_ids and emails from rows that already exist (one query)."""
+    ids = [row['unique_id'] for row in rows]
+    emails = [row['email'] for row in rows]
+    found = db.session.execute(
+        select(User.unique_id, User.email).where(or_(User.unique_id.in_(ids), User.email.in_(emails)))
+    ).all()
+    return {unique_id for unique_id, _ in found}, {email for _, email in found}
+
+
+def _insert(rows, hashes):
+    values = [{
+        'unique_id': row['unique_id'], 'email': row['email'], 'full_name': row['full_name'],
+        'password_hash': password_hash, 'role': row['role'], 'is_active': True,
+    } for row, password_hash in zip(rows, hashes)]
+    db.session.execute(User.__table__.insert(), values)
+
+
+def _import_chunk(rows, report):
+    taken_ids, taken_emails = _existing(rows)
+    fresh = []
+    for row in rows:
+        errors = []
+        if row['unique_id'] in taken_ids:
+            errors.append('unique_id already exists')
+        if row['email'] in taken_emails:
+            errors.append('email already exists')
+        if errors:
+            report['errors'].append({'row': row['line'], 'unique_id': row['unique_id'], 'email': row['email'], 'errors': errors})
+        else:
+            fresh.append(row)
+    if not fresh:
+        return
+
+    hashes = hash_passwords([row.pop('password') for row in fresh])
+    try:
+        _insert(fresh, hashes)
+        db.session.commit()
+        report['created'] += len(fresh)
+    except IntegrityError:
+        # Lost a race with another signup/import: retry row by row to find the culprits
+        db.session.rollback()
+        for row, password_hash in zip(fresh, hashes):
+            try:
+                _insert([row], [password_hash])
+                db.session.commit()
+                report['created'] += 1
+            except IntegrityError:
+                db.session.rollback()
+                report['errors'].append({'row': row['line'], 'unique_id': row['unique_id'], 'email': row['email'],
+                                         'errors': ['unique_id or email already exists']})
+
+
+def import_users_csv(stream, chunk_size, encoding='utf-8-sig'):
+    """Import users from a binary CSV stream. Returns {'created', 'failed', 'errors'}.
+
+    Each chunk is committed on its own, so rows before a failure stay imported.
+    Raises ImportFormatError when the header is missing required columns.
+    """
+    reader = csv.reader(io.TextIOWrapper(stream, encoding=encoding, newline=''))
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise ImportFormatError('The file is empty')
+    except UnicodeDecodeError:
+        raise ImportFormatError(f'The file is not {encoding} text')
+    columns = [COLUMN_ALIASES.get(name.strip().lower()) for name in header]
+    missing = [field for field in REQUIRED_COLUMNS if field not in columns]
+    if missing:
+        raise ImportFormatError(f"Missing required columns: {', '.join(missing)}")
+
+    report = {'created': 0, 'errors': []}
+    seen_ids, seen_emails = set(), set()
+    chunk = []
+    try:
+        for values in reader:
+            if not any(v.strip() for v in values):
+                continue
+            raw = {field: value for field, value in zip(columns, values) if field}
+            row, error = _validate(reader.line_num, raw, seen_ids, seen_emails)
+            if error:
+                report['errors'].append(error)
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                _import_chunk(chunk, report)
+                chunk = []
+    except UnicodeDecodeError:
+        report['errors'].append({'row': reader.line_num + 1, 'errors': [f'Not {encoding} text; import stopped here']})
+    except csv.Error as e:
+        report['errors'].append({'row': reader.line_num, 'errors': [f'Malformed CSV ({e}); import stopped here']})
+    if chunk:
+        _import_chunk(chunk, report)
+    report['errors'].sort(key=lambda error: error['row'])
+    report['failed'] = len(report['errors'])
+    return report
@@ -0,0 +1,97 @@
+# backend/user_listing.py
+
+import base64
+import datetime
+
+from sqlalchemy import select, or_, and_, union
+
+from database import db
+from models import User, UserRole
+
+# Admin user listing with keyset pagination: pages are ordered newest first by
+# (created_at, id) and the cursor is the last row's key, so fetching page 1000
+# costs the same index range scan as page 1 (no OFFSET). The role and is_active
+# filters line up with the composite indexes declared on User. A prefix search
+# is not constant-time: each searched column is matched by its own index range
+# scan, and the matching rows are then sorted, so a page costs O(matches).
+
+LISTABLE_FIELDS = {
+    'id': User.id,
+    'unique_id': User.unique_id,
+    'email': User.email,
+    'full_name': User.full_name,
+    'role': User.role,
+    'created_at': User.created_at,
+    'is_active': User.is_active,
+}
+
+
+class ListingError(ValueError):
+    """Bad listing parameter (unknown field, role or malformed cursor)."""
+
+
+def encode_cursor(created_at, user_id):
+    return base64.urlsafe_b64encode(f'{created_at.isoformat()}|{user_id}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, user_id = raw.split('|')
+        return datetime.datetime.fromisoformat(created_at), int(user_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ListingError('Invalid cursor')
+
+
+def parse_fields(fields):
+    """'id,email' -> ['id', 'email']; None/empty -> every listable field."""
+    if not fields:
+        return list(LISTABLE_FIELDS)
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in LISTABLE_FIELDS]
+    if unknown:
+        raise ListingError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(LISTABLE_FIELDS)}")
+    return names
+
+
+def _serialize(value):
+    if isinstance(value, UserRole):
+        return value.value
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def list_users(limit, cursor=None, role=None, is_active=None, search=None, fields=None):
+    """Return one page: {'users': [...only fields...], 'nextCursor': str or None}."""
+    names = parse_fields(fields)
+    # The key columns are always selected (the cursor needs them) but only returned if asked for
+    columns = [LISTABLE_FIELDS[name] for name in names if name not in ('created_at', 'id')]
+    query = select(User.created_at, User.id, *columns)
+
+    if role:
+        try:
+            query = query.where(User.role == UserRole(role))
+        except ValueError:
+            raise ListingError(f"Unknown role: {role}")
+    if is_active is not None:
+        query = query.where(User.is_active == is_active)
+    if search:
+        # One single-column prefix range per branch, so each can use that column's index
+        matches = union(
+            select(User.id).where(User.full_name.startswith(search, autoescape=True)),
+            select(User.id).where(User.email.startswith(search.lower(), autoescape=True)),
+            select(User.id).where(User.unique_id.startswith(search, autoescape=True)),
+        )
+        query = query.where(User.id.in_(matches.scalar_subquery()))
+    if cursor:
+        created_at, user_id = decode_cursor(cursor)
+        query = query.where(or_(User.created_at < created_at, and_(User.created_at == created_at, User.id < user_id)))
+
+    rows = db.session.execute(query.order_by(User.created_at.desc(), User.id.desc()).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    users = [{name: _serialize(row._mapping[LISTABLE_FIELDS[name]]) for name in names} for row in rows]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    return {'users': users, 'nextCursor': next_cursor}